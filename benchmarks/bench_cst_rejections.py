@@ -0,0 +1,106 @@
+"""Report how often generating each LibCST node type is rejected.
+
+For each concrete node type, we count attempts to draw an instance which were
+rejected (by ``CSTValidationError`` in ``builds_filtering``, or for exceeding
+Hypothesis' limits on depth and size), and for statements and expressions how many
+of the nodes drawn then failed to compile.
+Both are wasted work, so the aim is to get every row close to zero by generating
+valid nodes by construction.
+Run with ``python benchmarks/bench_cst_rejections.py [--types Name ...]``.
+"""
+
+import argparse
+import time
+from collections import Counter
+from inspect import isabstract
+
+import libcst
+from hypothesis import HealthCheck, Phase, given, settings, strategies as st
+
+from hypothesmith.cst import compilable, register_strategies
+
+
+def node_types() -> list:
+    return sorted(
+        (
+            t
+            for t in vars(libcst).values()
+            if isinstance(t, type)
+            and issubclass(t, libcst.CSTNode)
+            and not isabstract(t)
+        ),
+        key=lambda t: t.__name__,
+    )
+
+
+def render(node: libcst.CSTNode) -> str:
+    """Return source code for a statement or expression node, or raise TypeError."""
+    if isinstance(node, libcst.BaseExpression):
+        node = libcst.Expr(node)
+    if isinstance(node, libcst.BaseSmallStatement):
+        node = libcst.SimpleStatementLine([node])
+    if isinstance(node, (libcst.BaseCompoundStatement, libcst.SimpleStatementLine)):
+        node = libcst.Module([node])
+    if isinstance(node, libcst.Module):
+        return node.code
+    raise TypeError(f"Can't render {type(node).__name__} nodes")
+
+
+def rejection_counts(node_type: type, n: int) -> Counter:
+    counts: Counter = Counter()
+    strategy = st.from_type(node_type)
+
+    @settings(
+        max_examples=n,
+        database=None,
+        deadline=None,
+        phases=[Phase.generate],
+        suppress_health_check=list(HealthCheck),
+    )
+    @given(st.data())
+    def run(data):
+        counts["attempts"] += 1
+        node = data.draw(strategy)
+        counts["drawn"] += 1
+        try:
+            code = render(node)
+        except TypeError:
+            return
+        except libcst.CSTCodegenError:
+            code = ""
+        counts["renderable"] += 1
+        counts["compiled"] += bool(code) and compilable(code)
+
+    start = time.perf_counter()
+    run()
+    counts["seconds"] = time.perf_counter() - start
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--examples", type=int, default=20)
+    parser.add_argument("--types", nargs="*", help="node type names to check")
+    args = parser.parse_args()
+    register_strategies()
+    types = [t for t in node_types() if not args.types or t.__name__ in args.types]
+
+    print(f"{'node type':<28} {'attempts':>8} {'rejected':>9} {'uncompilable':>13}")
+    total: Counter = Counter()
+    for node_type in types:
+        counts = rejection_counts(node_type, args.examples)
+        total.update(counts)
+        rejected = 1 - counts["drawn"] / counts["attempts"]
+        invalid = "-"
+        if counts["renderable"]:
+            invalid = f"{1 - counts['compiled'] / counts['renderable']:.0%}"
+        print(
+            f"{node_type.__name__:<28} {counts['attempts']:>8} "
+            f"{rejected:>9.0%} {invalid:>13}"
+        )
+    print(
+        f"{'TOTAL':<28} {total['attempts']:>8} "
+        f"{1 - total['drawn'] / total['attempts']:>9.0%} "
+        f"{1 - total['compiled'] / max(total['renderable'], 1):>13.0%} "
+        f"in {total['seconds']:.0f}s"
+    )
@@ -0,0 +1,81 @@
+"""Measure time and memory used while drawing programs from ``from_grammar()``.
+
+We run a Hypothesis test which draws programs with targeting, so that it finds
+large examples as in real use, and use ``tracemalloc`` to record the peak memory
+allocated during each draw - above what was in use before it.  We report the mean
+and maximum of those peaks, and the bytes of peak per character of source generated, for
+all programs and for the largest tenth.  Tracing slows everything down, so we time
+a separate untraced run with the same seed.
+Run with ``python benchmarks/bench_draw_memory.py [--examples N]``.
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+import warnings
+
+from hypothesis import HealthCheck, Phase, given, seed, settings, strategies as st
+
+import hypothesmith
+from hypothesmith import validity
+
+
+def run(examples: int, traced: bool) -> tuple:
+    strategy = hypothesmith.from_grammar()
+    results = []
+
+    @seed(0)
+    @settings(
+        max_examples=examples,
+        database=None,
+        deadline=None,
+        phases=[Phase.generate, Phase.target],
+        suppress_health_check=list(HealthCheck),
+    )
+    @given(st.data())
+    def test(data):
+        if traced:
+            tracemalloc.start()
+        try:
+            source = data.draw(strategy)
+        finally:
+            if traced:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        results.append((len(source), peak if traced else 0))
+
+    start = time.perf_counter()
+    test()
+    return time.perf_counter() - start, results
+
+
+def report(label: str, results: list) -> None:
+    sizes = [size for size, _ in results]
+    peaks = [peak for _, peak in results]
+    print(
+        f"{label:<14} {len(results):>8} {statistics.mean(sizes):>10.0f} "
+        f"{statistics.mean(peaks) / 1024:>10.1f} {max(peaks) / 1024:>10.1f} "
+        f"{sum(peaks) / max(1, sum(sizes)):>12.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--examples", type=int, default=300)
+    args = parser.parse_args()
+    # e.g. "'int' object is not callable; perhaps you missed a comma?"
+    warnings.simplefilter("ignore", SyntaxWarning)
+    # Cache hits would make the traced and untraced runs differ.
+    validity.cache.resize(0)
+    seconds, untraced = run(args.examples, traced=False)
+    _, results = run(args.examples, traced=True)
+    print(f"{len(untraced)} programs in {seconds:.1f}s untraced")
+    print(
+        f"{'programs':<14} {'count':>8} {'mean chars':>10} {'mean KiB':>10} "
+        f"{'max KiB':>10} {'bytes/char':>12}"
+    )
+    report("all", results)
+    results.sort()
+    tenth = max(1, len(results) // 10)
+    report("largest tenth", results[-tenth:])
@@ -0,0 +1,210 @@
+"""Measure generation throughput, validity, latency, and diversity.
+
+For each start rule of ``from_grammar()``, ``from_node(libcst.Module)`` and a
+sample of other node types, and ``from_mutations()`` of our own source code, we
+draw examples with a fixed seed and report:
+
+- valid examples generated per second,
+- the fraction of attempts which were rejected or discarded,
+- mean and 99th-percentile latency of each attempt to draw an example, and
+- how many distinct ``ast`` node types the examples cover.
+
+We also time importing Hypothesmith, as in ``bench_import.py``.  Results are
+compared to ``baselines.json``, and we exit with an error if any has regressed by
+more than ``--tolerance``.  Coverage depends on how many examples we draw, so we
+only compare with baselines measured with the same ``--examples``, and timings vary
+between machines - so run with ``--save`` to record baselines on your own machine.
+The baselines file also records the machine and versions they were measured with.
+Run with ``python benchmarks/bench_generation.py [--save] [--only NAME ...]``.
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import platform
+import sys
+import time
+from importlib.metadata import version
+from typing import Dict, List
+
+import libcst
+from bench_import import STATEMENTS, time_statement
+from hypothesis import HealthCheck, Phase, given, seed, settings, strategies as st
+
+import hypothesmith
+from hypothesmith.cst import compile_mode
+from hypothesmith.syntactic import COMPILE_MODES
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+NODE_TYPES = ("Module", "FunctionDef", "If", "Assign", "BinaryOperation", "Call")
+# For each metric, whether larger values are better.
+HIGHER_IS_BETTER = {
+    "examples_per_second": True,
+    "rejected": False,
+    "mean_latency_ms": False,
+    "p99_latency_ms": False,
+    "node_types": True,
+    "import_ms": False,
+}
+
+
+def strategies() -> dict:
+    result = {
+        f"from_grammar({start!r})": (hypothesmith.from_grammar(start), mode)
+        for start, mode in COMPILE_MODES.items()
+    }
+    for name in NODE_TYPES:
+        node = getattr(libcst, name)
+        result[f"from_node({name})"] = (
+            hypothesmith.from_node(node),
+            compile_mode(node),
+        )
+    # Mutate our own source code, as a sample of realistic programs.
+    seeds = []
+    for path in sorted(glob.glob(os.path.join(hypothesmith.__path__[0], "*.py"))):
+        with open(path, encoding="utf-8") as f:
+            seeds.append(f.read())
+    result["from_mutations(hypothesmith)"] = (
+        hypothesmith.from_mutations(seeds),
+        "exec",
+    )
+    return result
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def measure_strategy(strategy: st.SearchStrategy, mode: str, n: int) -> dict:
+    latencies: List[float] = []
+    sources: List[str] = []
+
+    @seed(0)
+    @settings(
+        max_examples=n,
+        database=None,
+        deadline=None,
+        phases=[Phase.generate, Phase.target],
+        suppress_health_check=list(HealthCheck),
+    )
+    @given(st.data())
+    def run(data):
+        start = time.perf_counter()
+        try:
+            sources.append(data.draw(strategy))
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    node_types = set()
+    for source in sources:
+        node_types.update(type(n).__name__ for n in ast.walk(ast.parse(source, mode)))
+    return {
+        "examples": n,
+        "examples_per_second": len(sources) / seconds,
+        "rejected": 1 - len(sources) / len(latencies),
+        "mean_latency_ms": 1000 * sum(latencies) / len(latencies),
+        "p99_latency_ms": 1000 * percentile(latencies, 0.99),
+        "node_types": len(node_types),
+    }
+
+
+def machine() -> dict:
+    """Describe where we're measuring, since timings are only comparable there."""
+    return {
+        "platform": platform.platform(),
+        "processor": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "hypothesis": version("hypothesis"),
+        "libcst": version("libcst"),
+    }
+
+
+def regressions(results: dict, baselines: dict, tolerance: float) -> List[str]:
+    found = []
+    for name, metrics in results.items():
+        baseline_metrics = baselines.get(name, {})
+        if metrics.get("examples") != baseline_metrics.get("examples"):
+            continue
+        for metric, value in metrics.items():
+            baseline = baseline_metrics.get(metric)
+            if baseline is None or metric == "examples":
+                continue
+            if HIGHER_IS_BETTER[metric]:
+                worse = value < baseline * (1 - tolerance)
+            else:
+                # Allow some absolute slack, so e.g. 0% rejections isn't fragile.
+                worse = value > baseline * (1 + tolerance) + 0.01
+            if worse:
+                found.append(f"{name} {metric}: {value:.3g} vs baseline {baseline:.3g}")
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--examples", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=5, help="runs to time imports")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save", action="store_true", help="update baselines.json")
+    parser.add_argument("--only", nargs="*", help="names of strategies to measure")
+    args = parser.parse_args()
+
+    results: Dict[str, dict] = {}
+    print(
+        f"{'strategy':<30} {'examples/s':>10} {'rejected':>9} {'mean ms':>8} "
+        f"{'p99 ms':>8} {'node types':>10}"
+    )
+    for name, (strategy, mode) in strategies().items():
+        if args.only and name not in args.only:
+            continue
+        # Warm up first, so that one-off setup such as registering the strategies
+        # for LibCST nodes isn't counted against whichever strategy we measure first.
+        measure_strategy(strategy, mode, 10)
+        results[name] = r = measure_strategy(strategy, mode, args.examples)
+        print(
+            f"{name:<30} {r['examples_per_second']:>10.1f} {r['rejected']:>9.0%} "
+            f"{r['mean_latency_ms']:>8.1f} {r['p99_latency_ms']:>8.1f} "
+            f"{r['node_types']:>10}"
+        )
+    if not args.only:
+        for name, statement in STATEMENTS.items():
+            ms = 1000 * time_statement(statement, args.runs)
+            results[name] = {"import_ms": ms}
+            print(f"{name:<30} {ms:>10.1f} ms")
+
+    if args.save:
+        baselines = {}
+        if os.path.exists(BASELINES):
+            with open(BASELINES) as f:
+                baselines = json.load(f)
+        baselines.update(results)
+        baselines["machine"] = machine()
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return 0
+    if not os.path.exists(BASELINES):
+        print("No baselines to compare with; run with --save first", file=sys.stderr)
+        return 0
+    with open(BASELINES) as f:
+        baselines = json.load(f)
+    if baselines.get("machine") != machine():
+        print(
+            f"Baselines were measured on {baselines.get('machine')}, "
+            "so timings may not be comparable",
+            file=sys.stderr,
+        )
+    found = regressions(results, baselines, args.tolerance)
+    for line in found:
+        print("Regression:", line, file=sys.stderr)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
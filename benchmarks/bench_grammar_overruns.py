@@ -0,0 +1,65 @@
+"""Report how often drawing from the grammar overruns Hypothesis' choice budget.
+
+For each start rule we count attempts to draw a program, and how many were
+discarded by Hypothesis because they overran the buffer of choices or nested too
+deeply, or were rejected as invalid (counted by ``hypothesmith.stats``).  Discards
+are the more expensive failure: we only find out after making thousands of choices.
+Run with ``python benchmarks/bench_grammar_overruns.py [--examples N]``.
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from hypothesis import HealthCheck, Phase, given, settings, strategies as st
+
+from hypothesmith import from_grammar
+from hypothesmith.stats import collect_statistics
+
+START_RULES = ("file_input", "eval_input", "single_input")
+
+
+def discard_counts(start: str, n: int) -> Counter:
+    counts: Counter = Counter()
+    strategy = from_grammar(start)
+
+    @settings(
+        max_examples=n,
+        database=None,
+        deadline=None,
+        phases=[Phase.generate, Phase.target],
+        suppress_health_check=list(HealthCheck),
+    )
+    @given(st.data())
+    def run(data):
+        counts["attempts"] += 1
+        data.draw(strategy)
+        counts["drawn"] += 1
+
+    start_time = time.perf_counter()
+    with collect_statistics() as stats:
+        run()
+    counts["seconds"] = time.perf_counter() - start_time
+    counts["rejected"] = sum(
+        n for (section, *_), n in stats.rejections.items() if section == "grammar"
+    )
+    counts["discarded"] = counts["attempts"] - counts["drawn"] - counts["rejected"]
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--examples", type=int, default=100)
+    args = parser.parse_args()
+
+    print(
+        f"{'start rule':<14} {'attempts':>8} {'discarded':>9} {'rejected':>9} {'time':>6}"
+    )
+    for start in START_RULES:
+        counts = discard_counts(start, args.examples)
+        print(
+            f"{start:<14} {counts['attempts']:>8} "
+            f"{counts['discarded'] / counts['attempts']:>9.0%} "
+            f"{counts['rejected'] / counts['attempts']:>9.0%} "
+            f"{counts['seconds']:>5.0f}s"
+        )
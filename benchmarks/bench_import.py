@@ -0,0 +1,39 @@
+"""Measure the time taken to import Hypothesmith and get each strategy.
+
+Each statement is timed in a fresh interpreter, and we report the best of several
+runs to reduce noise.  Run with ``python benchmarks/bench_import.py``.
+"""
+
+import argparse
+import subprocess  # noqa: S404
+import sys
+
+STATEMENTS = {
+    "import hypothesmith": "import hypothesmith",
+    "hypothesmith.from_grammar": "import hypothesmith; hypothesmith.from_grammar",
+    "hypothesmith.from_node": "import hypothesmith; hypothesmith.from_node",
+    "from_node() first call": "import hypothesmith; hypothesmith.from_node()",
+}
+TIMER = "import time; _t = time.perf_counter(); {}; print(time.perf_counter() - _t)"
+
+
+def time_statement(statement: str, runs: int) -> float:
+    return min(
+        float(
+            subprocess.run(  # noqa: S603
+                [sys.executable, "-c", TIMER.format(statement)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+        )
+        for _ in range(runs)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    for name, statement in STATEMENTS.items():
+        print(f"{name:<28} {time_statement(statement, args.runs) * 1000:8.1f} ms")
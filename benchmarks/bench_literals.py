@@ -0,0 +1,85 @@
+"""Measure the cost of drawing numeric literals and other regex-defined strings.
+
+For each kind of numeric literal we compare ``st.from_regex()`` of the pattern
+from ``tokenize`` - as ``from_node()`` and ``from_grammar()`` used to draw them -
+with the strategy in ``hypothesmith.lexical`` which builds literals from their
+parts.  As in ``hypothesmith.stream()``, we draw directly from ``ConjectureData``
+objects with random choices, so the times don't include running a test.  We also
+time getting a regex strategy and drawing its first example, which pays for
+parsing the pattern, with and without the shared cache of
+``lexical.regex_strategy()``.
+Run with ``python benchmarks/bench_literals.py``.
+"""
+
+import argparse
+import random
+import time
+import tokenize
+
+import libcst
+from hypothesis import strategies as st
+from hypothesis.control import BuildContext
+from hypothesis.errors import StopTest
+from hypothesis.internal.conjecture.data import ConjectureData
+
+from hypothesmith import lexical
+
+LITERALS = {
+    "integer": (tokenize.Intnumber, lexical.integer_literals()),
+    "float": (tokenize.Floatnumber, lexical.float_literals()),
+    "imaginary": (tokenize.Imagnumber, lexical.imaginary_literals()),
+    "any number": (tokenize.Number, lexical.number_literals()),
+}
+PATTERNS = {
+    "SIMPLE_WHITESPACE_RE": libcst._nodes.whitespace.SIMPLE_WHITESPACE_RE,
+    "COMMENT_RE": libcst._nodes.whitespace.COMMENT_RE,
+    "Floatnumber": tokenize.Floatnumber,
+}
+
+
+def time_draws(strategy: st.SearchStrategy, examples: int) -> float:
+    """Return the mean time in microseconds to draw each example."""
+    rng = random.Random(0)  # noqa: S311
+    strategy.validate()
+    start = time.perf_counter()
+    for _ in range(examples):
+        data = ConjectureData(random=rng)
+        try:
+            with BuildContext(data, wrapped_test=time_draws):
+                data.draw(strategy)
+        except StopTest:
+            pass
+    return (time.perf_counter() - start) / examples * 1e6
+
+
+def time_first_draw(get_strategy) -> float:
+    """Return the time in microseconds to get a strategy and draw an example."""
+    start = time.perf_counter()
+    get_strategy().example()
+    return (time.perf_counter() - start) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--examples", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'literal':<12} {'from_regex':>12} {'by parts':>12}  speedup")
+    for name, (pattern, by_parts) in LITERALS.items():
+        regex = st.from_regex(pattern, fullmatch=True, alphabet=lexical.ALLOWED_CHARS)
+        before = time_draws(regex, args.examples)
+        after = time_draws(by_parts, args.examples)
+        print(f"{name:<12} {before:9.1f} us {after:9.1f} us  {before / after:5.1f}x")
+
+    print(f"\n{'pattern':<22} {'uncached':>12} {'cached':>12}")
+    for name, pattern in PATTERNS.items():
+        lexical.regex_strategy(pattern).example()
+        uncached = time_first_draw(
+            lambda pattern=pattern: st.from_regex(
+                pattern, fullmatch=True, alphabet=lexical.ALLOWED_CHARS
+            )
+        )
+        cached = time_first_draw(
+            lambda pattern=pattern: lexical.regex_strategy(pattern)
+        )
+        print(f"{name:<22} {uncached:9.0f} us {cached:9.0f} us")
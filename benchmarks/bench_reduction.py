@@ -0,0 +1,86 @@
+"""Measure the time to a minimal failing example, with and without reduction.
+
+We plant a bug - a "tool" which fails on any program which uses a variable - and
+run a test for it with each strategy, first with Hypothesis' usual shrinking,
+then without shrinking but with ``hypothesmith.reduction.reduce_failure()`` on the
+first failing example.  For each approach we report the time taken and the size
+of the final example, as the median of several seeds.
+Run with ``python benchmarks/bench_reduction.py``.
+"""
+
+import argparse
+import ast
+import statistics
+import time
+import warnings
+
+from hypothesis import HealthCheck, Phase, given, seed, settings
+
+import hypothesmith
+from hypothesmith.reduction import reduce_failure
+
+NO_SHRINK = [Phase.explicit, Phase.reuse, Phase.generate, Phase.target]
+STRATEGIES = {
+    "from_grammar()": hypothesmith.from_grammar,
+    "from_node()": hypothesmith.from_node,
+}
+
+
+def buggy_tool(source: str) -> None:
+    for node in ast.walk(ast.parse(source)):
+        assert not isinstance(node, ast.Name), "can't handle variables"
+
+
+def find_failure(strategy, random_seed: int, phases: list) -> str:
+    failures = []
+
+    @seed(random_seed)
+    @settings(
+        max_examples=10_000,
+        database=None,
+        deadline=None,
+        phases=phases,
+        suppress_health_check=list(HealthCheck),
+        report_multiple_bugs=False,
+    )
+    @given(strategy)
+    def test(source):
+        try:
+            buggy_tool(source)
+        except AssertionError:
+            failures.append(source)
+            raise
+
+    try:
+        test()
+    except AssertionError:
+        return failures[-1]
+    raise RuntimeError("no failure found")
+
+
+def run(strategy, random_seed: int, reduce: bool) -> tuple:
+    start = time.perf_counter()
+    if reduce:
+        source = find_failure(strategy, random_seed, NO_SHRINK)
+        source = reduce_failure(buggy_tool, source)
+    else:
+        source = find_failure(strategy, random_seed, list(Phase))
+    return time.perf_counter() - start, len(source)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+    # e.g. "'int' object is not callable; perhaps you missed a comma?"
+    warnings.simplefilter("ignore", SyntaxWarning)
+    print(f"{'strategy':<16} {'approach':<22} {'seconds':>8} {'length':>8}")
+    for name, make in STRATEGIES.items():
+        for approach, reduce in [
+            ("Hypothesis shrinking", False),
+            ("reduce_failure()", True),
+        ]:
+            results = [run(make(), s, reduce) for s in range(args.seeds)]
+            seconds = statistics.median(r[0] for r in results)
+            length = statistics.median(r[1] for r in results)
+            print(f"{name:<16} {approach:<22} {seconds:8.2f} {length:8.0f}")
@@ -0,0 +1,74 @@
+"""Measure the per-example overhead of ``auto_target=True``.
+
+We generate a sample of programs once, then time the work done for each example
+with and without targeting: validation alone is a single compile, while targeting
+also has to measure the code.  We compare against the previous approach, which
+parsed and compiled each program again and built lists of nodes and instructions.
+Run with ``python benchmarks/bench_targets.py``.
+"""
+
+import argparse
+import ast
+import dis
+import timeit
+
+from hypothesis import HealthCheck, Phase, given, settings
+
+import hypothesmith
+from hypothesmith.metrics import compile_with_tree, measure
+
+
+def sample_programs(n: int) -> list:
+    programs = []
+
+    @settings(
+        max_examples=n,
+        database=None,
+        deadline=None,
+        phases=[Phase.generate],
+        suppress_health_check=list(HealthCheck),
+    )
+    @given(hypothesmith.from_grammar())
+    def collect(source):
+        programs.append(source)
+
+    collect()
+    return programs
+
+
+def validate_only(source: str) -> None:
+    compile(source, "<string>", "exec")
+
+
+def validate_and_measure_previously(source: str) -> None:
+    compile(source, "<string>", "exec")
+    nodes = list(ast.walk(ast.parse(source)))
+    len({type(n) for n in nodes})
+    len(list(dis.Bytecode(compile(source, "<string>", "exec"))))
+
+
+def validate_and_measure(source: str) -> None:
+    measure(*compile_with_tree(source, "exec"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--examples", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    programs = sample_programs(args.examples)
+    size = sum(map(len, programs)) / len(programs)
+    print(f"{len(programs)} programs, mean length {size:.0f} characters")
+
+    def per_example(func) -> float:
+        timer = timeit.Timer(lambda: [func(p) for p in programs])
+        return min(timer.repeat(args.repeat, number=1)) / len(programs) * 1e6
+
+    baseline = per_example(validate_only)
+    print(f"{'auto_target=False (validate only)':<42} {baseline:8.1f} us")
+    for name, func in [
+        ("auto_target=True (previous approach)", validate_and_measure_previously),
+        ("auto_target=True (hypothesmith.metrics)", validate_and_measure),
+    ]:
+        cost = per_example(func)
+        print(f"{name:<42} {cost:8.1f} us  (+{cost - baseline:.1f} us)")
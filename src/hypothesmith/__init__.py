@@ -1,7 +1,41 @@
 """Hypothesis strategies for generating Python source code, somewhat like CSmith."""
 
-from hypothesmith.cst import from_node
-from hypothesmith.syntactic import from_grammar
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
 
-__version__ = "0.3.3"
-__all__ = ["from_grammar", "from_node"]
+if TYPE_CHECKING:  # pragma: no cover
+    from hypothesmith.corpus import from_corpus
+    from hypothesmith.cst import from_node
+    from hypothesmith.lexical import from_tokens
+    from hypothesmith.mutation import from_mutations
+    from hypothesmith.streaming import stream
+    from hypothesmith.syntactic import from_grammar
+
+__version__ = "0.4.0"
+__all__ = [
+    "from_corpus",
+    "from_grammar",
+    "from_mutations",
+    "from_node",
+    "from_tokens",
+    "stream",
+]
+
+# Our public strategies are imported on first use, so that e.g. `from_grammar()`
+# doesn't have to wait for LibCST to be imported.
+_LAZY_ATTRIBUTES = {
+    "from_corpus": "hypothesmith.corpus",
+    "from_grammar": "hypothesmith.syntactic",
+    "from_node": "hypothesmith.cst",
+    "from_mutations": "hypothesmith.mutation",
+    "from_tokens": "hypothesmith.lexical",
+    "stream": "hypothesmith.streaming",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,225 @@
+"""Generate a corpus of Python programs from the command line.
+
+For example, to write a thousand programs from the grammar to a directory::
+
+    python -m hypothesmith generate --count 1000 --output corpus/
+
+or programs built from LibCST nodes to a JSON Lines file, using four processes::
+
+    python -m hypothesmith generate --node FunctionDef --output corpus.jsonl --jobs 4
+
+Each batch of programs is drawn in a worker process with its own seed, and we skip
+any program we've already written, so the output never contains duplicates.  We
+write batches in order of their seeds, so the same ``--seed`` always writes the
+same programs, however many ``--jobs`` we use.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Iterator, List, Optional, Sequence
+
+from hypothesis import HealthCheck, Phase, given, seed, settings
+
+from .syntactic import COMPILE_MODES
+
+BATCH_SIZE = 100
+
+
+def generate_batch(
+    start: str, node: Optional[str], auto_target: bool, batch_seed: int, count: int
+) -> List[str]:
+    """Return up to `count` programs, drawn using the given seed.
+
+    The same arguments always return the same programs, in any process.
+
+    This runs in a worker process, so we take the name of the start rule or node
+    type and build the strategy here, rather than pickling it.
+    """
+    if node is None:
+        from .syntactic import from_grammar
+
+        strategy = from_grammar(start, auto_target=auto_target)
+    else:
+        import libcst
+
+        from .cst import from_node
+
+        strategy = from_node(getattr(libcst, node), auto_target=auto_target)
+    programs: List[str] = []
+
+    @seed(batch_seed)
+    @settings(
+        max_examples=count,
+        database=None,
+        deadline=None,
+        phases=[Phase.generate, Phase.target],
+        suppress_health_check=list(HealthCheck),
+    )
+    @given(strategy)
+    def collect(source: str) -> None:
+        programs.append(source)
+
+    collect()
+    return programs
+
+
+def batches(args: argparse.Namespace) -> Iterator[List[str]]:
+    """Yield batches of programs, drawn in parallel if args.jobs > 1."""
+    size = min(BATCH_SIZE, args.count)
+    options = (args.start, args.node, args.auto_target)
+    if args.jobs == 1:
+        for batch_seed in range(args.seed, args.seed + args.max_batches):
+            yield generate_batch(*options, batch_seed, size)
+        return
+    seeds = iter(range(args.seed, args.seed + args.max_batches))
+    with ProcessPoolExecutor(args.jobs) as executor:
+        # We yield batches in order of their seeds rather than as they finish, so
+        # that the output doesn't depend on how long each batch took.
+        pending = deque(
+            executor.submit(generate_batch, *options, batch_seed, size)
+            for batch_seed in islice(seeds, args.jobs)
+        )
+        try:
+            while pending:
+                batch = pending.popleft().result()
+                batch_seed = next(seeds, None)
+                if batch_seed is not None:
+                    pending.append(
+                        executor.submit(generate_batch, *options, batch_seed, size)
+                    )
+                yield batch
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+@contextmanager
+def open_output(path: str) -> Iterator[Callable[[str, str], None]]:
+    """Yield a function which writes a program, given its hash and source code.
+
+    Paths ending in `.jsonl` get one JSON object per line, and otherwise we write
+    each program to a `.py` file named by its hash in the `path` directory.
+    """
+    if path.endswith(".jsonl"):
+        with open(path, "w", encoding="utf-8", errors="surrogatepass", newline="") as f:
+
+            def write(digest: str, source: str) -> None:
+                f.write(json.dumps({"sha256": digest, "source": source}) + "\n")
+
+            yield write
+    else:
+        os.makedirs(path, exist_ok=True)
+
+        def write(digest: str, source: str) -> None:
+            filename = os.path.join(path, digest + ".py")
+            with open(
+                filename, "w", encoding="utf-8", errors="surrogatepass", newline=""
+            ) as f:
+                f.write(source)
+
+        yield write
+
+
+def generate(args: argparse.Namespace) -> int:
+    seen = set()
+    written = size = duplicates = 0
+    start_time = time.perf_counter()
+    with open_output(args.output) as write:
+        for batch in batches(args):
+            for source in batch:
+                encoded = source.encode("utf-8", "surrogatepass")
+                digest = hashlib.sha256(encoded).hexdigest()
+                if digest in seen:
+                    duplicates += 1
+                    continue
+                seen.add(digest)
+                write(digest, source)
+                written += 1
+                size += len(encoded)
+                if written == args.count:
+                    break
+            if written == args.count:
+                break
+    seconds = time.perf_counter() - start_time
+    print(
+        f"Wrote {written} programs ({size} bytes) to {args.output} in {seconds:.1f}s: "
+        f"{written / seconds:.1f} programs/sec, {size / seconds:.0f} bytes/sec, "
+        f"skipped {duplicates} duplicates",
+        file=sys.stderr,
+    )
+    if written < args.count:
+        print(
+            f"Only found {written} distinct programs in {args.max_batches} batches",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m hypothesmith")
+    commands = parser.add_subparsers(dest="command", required=True)
+    gen = commands.add_parser(
+        "generate",
+        help="write a corpus of generated programs",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    gen.add_argument("--count", type=int, default=100, help="number of programs")
+    gen.add_argument(
+        "--output",
+        required=True,
+        help="a directory for .py files, or a file ending in .jsonl",
+    )
+    source = gen.add_mutually_exclusive_group()
+    source.add_argument(
+        "--start",
+        choices=sorted(COMPILE_MODES),
+        default="file_input",
+        help="grammar rule for from_grammar() (default: file_input)",
+    )
+    source.add_argument("--node", help="LibCST node type for from_node(), e.g. Expr")
+    gen.add_argument(
+        "--no-auto-target",
+        dest="auto_target",
+        action="store_false",
+        help="don't drive generation towards larger programs",
+    )
+    gen.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes (default: one per CPU)",
+    )
+    gen.add_argument(
+        "--seed", type=int, default=0, help="seed for the first batch (default: 0)"
+    )
+    gen.add_argument(
+        "--max-batches",
+        type=int,
+        default=1000,
+        help=f"give up after this many batches of {BATCH_SIZE} (default: 1000)",
+    )
+    args = parser.parse_args(argv)
+    if args.count < 1 or args.jobs < 1 or args.max_batches < 1:
+        parser.error("--count, --jobs, and --max-batches must be positive")
+    if args.node is not None:
+        import libcst
+
+        if not isinstance(getattr(libcst, args.node, None), type) or not issubclass(
+            getattr(libcst, args.node), libcst.CSTNode
+        ):
+            parser.error(f"--node={args.node!r} is not a LibCST node type")
+    return generate(args)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
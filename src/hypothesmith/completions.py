@@ -0,0 +1,105 @@
+"""Tables of the cheapest way to finish drawing each symbol of a grammar.
+
+Grammar-based generation can wander: the rules for Python expressions are
+recursive, and if we choose among expansions uniformly at random a derivation will
+often grow without limit.  Knowing the least depth, number of statements, and size
+in which each symbol can be completed lets us steer towards finishing the program,
+either to stay within a budget or when we're running out of choices to make.
+"""
+
+from typing import Callable, Dict, Iterable, NamedTuple, Sequence, Tuple
+
+from lark import Lark
+from lark.grammar import Symbol
+
+# Rules which count as statements; each statement is drawn from exactly one of these.
+STATEMENT_RULES = frozenset({"small_stmt", "compound_stmt"})
+
+Expansions = Dict[str, Sequence[Tuple[Symbol, ...]]]
+
+
+def min_costs(
+    expansions: Expansions,
+    terminal_costs: Dict[str, int],
+    rule_cost: Callable[[str], int],
+    combine: Callable[[Iterable[float]], float],
+) -> Dict[str, float]:
+    """Return a lower bound on the cost of completing each rule and terminal.
+
+    The cost of a rule is ``rule_cost(name)`` plus the cheapest of its expansions,
+    where the cost of an expansion is ``combine`` applied to the costs of each
+    symbol.  Rules may be recursive, so we iterate until nothing changes.
+    """
+    costs: Dict[str, float] = dict.fromkeys(expansions, float("inf"))
+    costs.update(terminal_costs)
+    changed = True
+    while changed:
+        changed = False
+        for name, options in expansions.items():
+            cost = rule_cost(name) + min(
+                combine(costs[symbol.name] for symbol in expansion)
+                for expansion in options
+            )
+            if cost < costs[name]:
+                costs[name] = cost
+                changed = True
+    return costs
+
+
+class Completions(NamedTuple):
+    """The least depth, statements, and size needed to finish each symbol.
+
+    We also record the expansion of each rule which finishes soonest.
+    """
+
+    depth: Dict[str, float]
+    statements: Dict[str, float]
+    size: Dict[str, float]
+    shortest: Dict[str, Tuple[Symbol, ...]]
+
+    def cost(self, expansion: Sequence[Symbol]) -> Tuple[float, float, float]:
+        """Return the least (depth, statements, size) to finish an expansion."""
+        return (
+            max((self.depth[s.name] for s in expansion), default=0),
+            sum(self.statements[s.name] for s in expansion),
+            sum(self.size[s.name] for s in expansion),
+        )
+
+
+def completions(
+    grammar: Lark, start: str, terminal_sizes: Dict[str, int]
+) -> Completions:
+    """Compute the completion table for `grammar`, starting from `start`.
+
+    Terminal sizes are taken from the minimum width of their patterns, except for
+    those in `terminal_sizes` - which is how we handle e.g. declared terminals.
+    """
+    terminals, rules, _ = grammar.grammar.compile([start], ())
+    expansions: Dict[str, list] = {}
+    for rule in rules:
+        expansions.setdefault(rule.origin.name, []).append(tuple(rule.expansion))
+    sizes = {t.name: t.pattern.min_width for t in terminals}
+    sizes.update(terminal_sizes)
+    for expansion in (e for options in expansions.values() for e in options):
+        for symbol in expansion:
+            if symbol.is_term:
+                sizes.setdefault(symbol.name, 0)
+    table = Completions(
+        depth=min_costs(
+            expansions,
+            dict.fromkeys(sizes, 0),
+            lambda name: 1,
+            lambda costs: max(costs, default=0),
+        ),
+        statements=min_costs(
+            expansions,
+            dict.fromkeys(sizes, 0),
+            lambda name: name in STATEMENT_RULES,
+            sum,
+        ),
+        size=min_costs(expansions, sizes, lambda name: 0, sum),
+        shortest={},
+    )
+    for name, options in expansions.items():
+        table.shortest[name] = min(options, key=table.cost)
+    return table
@@ -0,0 +1,164 @@
+"""A persistent corpus of generated programs, to replay in later test runs.
+
+Generating a large and interesting program takes many draws, each checked by
+compiling it, and auto-targeting then spends more examples climbing towards larger
+programs.  When the same tests run again - e.g. in CI - we redo all that work to
+reach programs we've already seen.  Instead, we can save the best programs found
+and replay them, so the next run starts from there.
+
+A corpus is a directory of ``<sha256>.py`` files, as written by
+``python -m hypothesmith generate``, with a ``<sha256>.json`` file alongside for
+programs we've recorded here, holding the Python version and target scores.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from hypothesis import strategies as st
+
+PYTHON_VERSION = "{}.{}".format(*sys.version_info)
+
+
+def source_digest(source: str) -> str:
+    """Return the SHA-256 hex digest of source, which names it in a corpus."""
+    return hashlib.sha256(source.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def write_atomic(path: str, text: str) -> None:
+    # Write to a temporary file then rename it, so that concurrent test processes
+    # never see a partially-written program.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with open(fd, "w", encoding="utf-8", errors="surrogatepass", newline="") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class Entry(NamedTuple):
+    source: str
+    targets: Dict[str, float]
+
+
+class Corpus:
+    """The programs in a corpus directory, and their target scores.
+
+    We only record a program if it would be among the ``keep`` highest-scoring
+    for at least one target label, so the corpus grows only slowly however many
+    times the tests run.  Programs recorded on a different version of Python are
+    ignored, as they might not be valid on this one.  Other ``.py`` files, e.g.
+    seed programs added by hand, are loaded whatever their name.
+    """
+
+    def __init__(self, path: str, keep: int = 10) -> None:
+        self.path = path
+        self.keep = keep
+        self.entries: Dict[str, Entry] = {}
+        os.makedirs(path, exist_ok=True)
+        for name in sorted(os.listdir(path)):
+            stem, ext = os.path.splitext(name)
+            if ext == ".py":
+                entry = self.load(stem)
+                if entry is not None:
+                    # Keyed by the digest of the source rather than the filename,
+                    # which needn't be a digest if the file was added by hand.
+                    self.entries[source_digest(entry.source)] = entry
+
+    def load(self, stem: str) -> Optional[Entry]:
+        base = os.path.join(self.path, stem)
+        # newline="" so that we read exactly the source which was written, including
+        # any \r characters.
+        with open(
+            base + ".py", encoding="utf-8", errors="surrogatepass", newline=""
+        ) as f:
+            source = f.read()
+        targets: Dict[str, float] = {}
+        if os.path.exists(base + ".json"):
+            with open(base + ".json") as f:
+                meta = json.load(f)
+            if meta.get("python") != PYTHON_VERSION:
+                return None
+            targets = meta.get("targets", {})
+        return Entry(source, targets)
+
+    def is_interesting(self, targets: Dict[str, float]) -> bool:
+        """Return True if these scores would be among the best we have."""
+        for label, score in targets.items():
+            scores = sorted(
+                (e.targets[label] for e in self.entries.values() if label in e.targets),
+                reverse=True,
+            )
+            if len(scores) < self.keep or score > scores[self.keep - 1]:
+                return True
+        return False
+
+    def add(self, source: str, targets: Dict[str, float]) -> bool:
+        """Record source in the corpus if it's new and scored highly enough."""
+        digest = source_digest(source)
+        if digest in self.entries or not self.is_interesting(targets):
+            return False
+        base = os.path.join(self.path, digest)
+        meta = {"python": PYTHON_VERSION, "targets": targets}
+        write_atomic(base + ".json", json.dumps(meta, sort_keys=True))
+        write_atomic(base + ".py", source)
+        self.entries[digest] = Entry(source, targets)
+        return True
+
+    def programs(self) -> List[str]:
+        """Return the programs in the corpus, smallest first."""
+        return sorted((e.source for e in self.entries.values()), key=len)
+
+
+@st.composite
+def replay(
+    draw: Any, corpus: Corpus, stored: List[str], fresh: st.SearchStrategy[str]
+) -> str:
+    data = draw.__self__
+    # `stored` is fixed when the strategy is created, because Hypothesis requires
+    # that the same choices always draw the same values - so programs added to the
+    # corpus during this run are only replayed by later runs.  We shrink towards
+    # fresh programs, and towards the smallest stored programs.
+    if stored and draw(st.booleans()):
+        source = draw(st.sampled_from(stored))
+        # Report the stored scores, so that targeting starts from the best
+        # programs found in previous runs rather than from scratch.
+        for label, score in corpus.entries[source_digest(source)].targets.items():
+            data.target_observations[label] = max(
+                score, data.target_observations.get(label, score)
+            )
+        return source
+    before = dict(data.target_observations)
+    source = draw(fresh)
+    corpus.add(
+        source,
+        {
+            label: score
+            for label, score in data.target_observations.items()
+            if before.get(label) != score
+        },
+    )
+    return source
+
+
+def from_corpus(
+    path: str, strategy: Optional[st.SearchStrategy[str]] = None, *, keep: int = 10
+) -> st.SearchStrategy[str]:
+    """Generate programs by replaying a corpus, or drawing from ``strategy``.
+
+    ``path`` is a directory of programs, which is created if it doesn't exist.
+    Half of the examples are replayed from the corpus and half are drawn from
+    ``strategy`` - by default ``from_grammar()`` - and fresh programs which are
+    among the ``keep`` highest-scoring for any target are added to the corpus,
+    to be replayed the next time ``from_corpus()`` is called.
+    Programs are scored by ``auto_target``, so other strategies only replay
+    what's already in the corpus, e.g. as written by ``python -m hypothesmith``.
+    """
+    assert isinstance(keep, int) and keep >= 1, keep
+    if strategy is None:
+        from .syntactic import from_grammar
+
+        strategy = from_grammar()
+    corpus = Corpus(os.fspath(path), keep)
+    return replay(corpus, corpus.programs(), strategy)
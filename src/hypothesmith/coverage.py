@@ -0,0 +1,53 @@
+"""Track which alternatives of each grammar rule our examples have used.
+
+Some constructs, like ``match`` statements or async comprehensions, are only
+reachable through a chain of unlikely choices, and so almost never generated.
+By counting how often each alternative has appeared in valid examples, we can
+score each new example by how rare its choices were and pass that score to
+``hypothesis.target()`` - driving generation towards whatever we haven't yet
+covered.
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from lark.grammar import Symbol
+
+Alternative = Tuple[str, int]
+
+
+class GrammarCoverage:
+    """Counts of how many valid examples used each alternative of each rule.
+
+    An alternative is identified by the name of the rule and the index of the
+    expansion, in the order used by ``GrammarStrategy.expansions``.
+    """
+
+    def __init__(self, expansions: Dict[str, Sequence[Tuple[Symbol, ...]]]) -> None:
+        self.expansions = expansions
+        self.counts: Counter = Counter()
+
+    def rarity(self, used: Iterable[Alternative]) -> float:
+        """Return a score which is higher for examples using rarer alternatives.
+
+        Each alternative contributes ``1 / (1 + n)``, where n is the number of
+        previous examples which used it - so an alternative we've never covered
+        counts for far more than one we've seen many times.
+        """
+        return sum(1 / (1 + self.counts[alt]) for alt in used)
+
+    def record(self, used: Iterable[Alternative]) -> None:
+        self.counts.update(used)
+
+    def uncovered(self) -> List[Tuple[str, Tuple[str, ...]]]:
+        """Return the (rule, expansion) pairs which no example has used yet."""
+        return [
+            (name, tuple(symbol.name for symbol in expansion))
+            for name, options in self.expansions.items()
+            for i, expansion in enumerate(options)
+            if (name, i) not in self.counts
+        ]
+
+    def fraction_covered(self) -> float:
+        total = sum(map(len, self.expansions.values()))
+        return len(self.counts) / total
@@ -5,15 +5,24 @@ Thanks to Instagram for open-sourcing libCST (which is great!) and
 thanks to Tolkein for the name of this module.
 """
 
-import ast
-import dis
+import collections.abc
+import dataclasses
+from functools import lru_cache, partial
 from inspect import getfullargspec, isabstract
-from tokenize import (
-    Floatnumber as FLOATNUMBER_RE,
-    Imagnumber as IMAGNUMBER_RE,
-    Intnumber as INTNUMBER_RE,
+from operator import attrgetter
+from time import perf_counter
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    get_args,
+    get_origin,
+    get_type_hints,
 )
-from typing import Type
 
 import libcst
 from hypothesis import assume, infer, strategies as st, target
@@ -21,211 +30,606 @@ from hypothesis.strategies._internal.types import _global_type_lookup
 from libcst._nodes.expression import ExpressionPosition
 from libcst._nodes.statement import _INDENT_WHITESPACE_RE
 
-from .syntactic import ALLOWED_CHARS
+from . import scopes, stats, validity
+from .generated import OUTPUTS, GeneratedSource
+from .lexical import (
+    float_literals,
+    identifiers,
+    imaginary_literals,
+    integer_literals,
+    regex_strategy,
+)
+from .metrics import measure
 
+# Hypothesis' lists have five elements on average, and if every sequence in a
+# syntax tree was that long we would usually run out of data before finishing.
+MAX_SEQUENCE_SIZE = 3
 
-def py_from_regex(pattern):
-    return st.from_regex(pattern, fullmatch=True, alphabet=ALLOWED_CHARS)
+# Node types which are only valid in some scopes, e.g. `break` only in a loop, and
+# the scope we're drawing in - see `hypothesmith.scopes`.
+SCOPED_NODES = {
+    libcst.Await: scopes.AWAIT,
+    libcst.Break: scopes.LOOP,
+    libcst.Continue: scopes.LOOP,
+    libcst.Nonlocal: scopes.NONLOCAL,
+    libcst.Return: scopes.RETURN,
+    libcst.Yield: scopes.YIELD,
+}
+_scopes: List[scopes.Scope] = [scopes.MODULE]
 
 
-# For some nodes, we just need to ensure that they use the appropriate regex
-# pattern instead of allowing literally any string.
-for node_type, pattern in {
-    libcst.Float: FLOATNUMBER_RE,
-    libcst.Integer: INTNUMBER_RE,
-    libcst.Imaginary: IMAGNUMBER_RE,
-    libcst.SimpleWhitespace: libcst._nodes.whitespace.SIMPLE_WHITESPACE_RE,
-}.items():
-    _strategy = st.builds(node_type, py_from_regex(pattern))
-    st.register_type_strategy(node_type, _strategy)
+@st.composite
+def sequence_of(draw, *node, min_size=0):  # type: ignore
+    # `st.register_type_strategy()` resolves every strategy it's passed, even if
+    # deferred, so we wait until drawing to look up the strategies for each node.
+    return draw(_sequence_strategy(node, min_size))
+
+
+@lru_cache(maxsize=None)
+def _sequence_strategy(
+    node: Tuple[Type[libcst.CSTNode], ...], min_size: int
+) -> st.SearchStrategy:
+    # Built on the first draw and then reused, rather than building and validating
+    # a new strategy for every sequence we draw.
+    return st.lists(
+        st.one_of(*map(st.from_type, node)),
+        min_size=min_size,
+        max_size=MAX_SEQUENCE_SIZE,
+    )
 
-# type-ignore comments are special in the 3.8+ (typed) ast, so boost their chances)
-_comments = py_from_regex(libcst._nodes.whitespace.COMMENT_RE)
-st.register_type_strategy(
-    libcst.Comment, st.builds(libcst.Comment, _comments | st.just("# type: ignore"))
-)
 
-# `from_type()` has less laziness than other strategies, we we register for these
-# foundational node types *before* referring to them in other strategies.
-st.register_type_strategy(
-    libcst.Name, st.builds(libcst.Name, st.text().filter(str.isidentifier))
-)
-st.register_type_strategy(
-    libcst.SimpleString, st.builds(libcst.SimpleString, st.text().map(repr))
-)
+def nonempty_seq(*node: Type[libcst.CSTNode]) -> st.SearchStrategy:
+    return sequence_of(*node, min_size=1)
 
-# Ensure that ImportAlias uses Attribute nodes composed only of Name nodes.
-names = st.from_type(libcst.Name)
-name_only_attributes = st.one_of(
-    names,
-    st.builds(libcst.Attribute, names, names),
-    st.builds(libcst.Attribute, st.builds(libcst.Attribute, names, names), names),
-)
-st.register_type_strategy(
-    libcst.ImportAlias, st.builds(libcst.ImportAlias, name_only_attributes)
-)
 
+def without_trailing_comma(nodes: st.SearchStrategy) -> st.SearchStrategy:
+    # e.g. `global a, b,` is invalid, so we replace the comma on the last item
+    return nodes.map(
+        lambda xs: xs[:-1] + [xs[-1].with_changes(comma=libcst.MaybeSentinel.DEFAULT)]
+    )
 
-def nonempty_seq(*node: Type[libcst.CSTNode]) -> st.SearchStrategy:
-    return st.lists(st.one_of(*map(st.from_type, node)), min_size=1)
-
-
-# There are around 150 concrete types of CST nodes.  Delightfully, libCST uses
-# dataclasses for all these classes, so we can allow the `builds` & `from_type`
-# inference to provide most of our arguments for us.
-# However, in some cases we want to either restrict arguments (e.g. libcst.Name),
-# or supply something nastier than the default argument (e.g. libcst.SimpleWhitespace)
-nonempty_whitespace = st.builds(libcst.SimpleWhitespace, py_from_regex(" +"))
-REGISTERED = (
-    [libcst.Asynchronous, nonempty_whitespace],
-    [libcst.AsName, st.from_type(libcst.Name)],
-    [libcst.AnnAssign, infer, infer, infer],
-    [libcst.Assign, nonempty_seq(libcst.AssignTarget)],
-    [libcst.Await, infer, st.just(()), st.just(()), nonempty_whitespace],
-    [libcst.Attribute, infer, infer, infer],
-    [libcst.Comparison, infer, nonempty_seq(libcst.ComparisonTarget)],
-    [libcst.Decorator, st.from_type(libcst.Name) | st.from_type(libcst.Attribute)],
-    [libcst.EmptyLine, infer, infer, infer],
-    [libcst.ExceptHandler, infer, infer, infer, infer, nonempty_whitespace, infer],
-    [libcst.Global, nonempty_seq(libcst.NameItem)],
-    [libcst.Import, nonempty_seq(libcst.ImportAlias)],
-    [
-        libcst.ImportFrom,
-        st.from_type(libcst.Name) | st.from_type(libcst.Attribute),
-        nonempty_seq(libcst.ImportAlias),
-    ],
-    [libcst.IndentedBlock, infer, infer, py_from_regex(_INDENT_WHITESPACE_RE)],
-    [libcst.IsNot, infer, nonempty_whitespace, infer],
-    [
-        libcst.MatchSingleton,
-        st.builds(libcst.Name, st.sampled_from(["None", "False", "True"])),
-    ],
-    [libcst.NamedExpr, st.from_type(libcst.Name)],
-    [
-        libcst.Nonlocal,
-        nonempty_seq(libcst.NameItem).map(
-            lambda names: names[:-1]
-            + [names[-1].with_changes(comma=libcst.MaybeSentinel.DEFAULT)]
-        ),
-    ],
-    [libcst.NotEqual, st.just("!=")],
-    [libcst.NotIn, infer, nonempty_whitespace, infer],
-    [libcst.Set, nonempty_seq(libcst.Element, libcst.StarredElement)],
-    [libcst.Subscript, infer, nonempty_seq(libcst.SubscriptElement)],
-    [libcst.TrailingWhitespace, infer, infer],
-    [libcst.With, nonempty_seq(libcst.WithItem)],
-)
+
+def call_arg_order(arg: libcst.Arg) -> int:
+    # Positional arguments must come before keyword arguments, and `*args` before
+    # `**kwargs`; this order is always valid.
+    return [arg.star == "*", arg.keyword is not None, arg.star == "**"].count(True)
 
 
 @st.composite
 def builds_filtering(draw, t, **kwargs):  # type: ignore
-    try:
-        return draw(st.builds(t, **kwargs))
-    except libcst.CSTValidationError:
-        assume(False)
+    return build_node(draw, t, tuple(kwargs.items()))
 
 
-# This is where the magic happens: teach `st.from_type` to generate each node type
-for node_type, *strats in REGISTERED:
-    # TODO: once everything else is working, come back here and use `infer` for
-    # all arguments without an explicit strategy - inference is more "interesting"
-    # than just using the default argument... in the proverbial sense.
-    # Mostly this will consist of ensuring that parens remain balanced.
-    args = [name for name in getfullargspec(node_type).args if name != "self"]
-    kwargs = dict(zip(args, strats))
-    st.register_type_strategy(node_type, builds_filtering(node_type, **kwargs))
-
-# We have special handling for `Try` nodes, because there are two options.
-# If a Try node has no `except` clause, it *must* have a `finally` clause and
-# *must not* have an `else` clause.  With one or more except clauses, it may
-# have an else and/or a finally, or neither.
-# The .map() ensures that any bare-`except:` clauses are ordered last.
-st.register_type_strategy(
-    libcst.Try,
-    st.builds(libcst.Try, finalbody=st.from_type(libcst.Finally))
-    | st.builds(
-        libcst.Try,
-        body=infer,
-        handlers=st.lists(
-            st.deferred(lambda: st.from_type(libcst.ExceptHandler)),
-            min_size=1,
-            unique_by=lambda caught: caught.type,
-        ).map(lambda xs: sorted(xs, key=lambda x: x.type is None)),
-        orelse=infer,
-        finalbody=infer,
-    ),
-)
+def build_node(draw, t, kwargs, **values):  # type: ignore
+    """Draw a node of type t as for `st.builds(t, **dict(kwargs))`.
 
-# Assert can either have a comma and message, or neither
-st.register_type_strategy(
-    libcst.Assert,
-    st.builds(
-        libcst.Assert,
-        test=infer,
-        whitespace_after_assert=nonempty_whitespace,
-        semicolon=infer,
+    Fields in `values` are passed as-is rather than drawn, and invalid nodes are
+    rejected.
+    """
+    # Parenthesized nodes need as many left parens as right parens, so unless they
+    # were passed explicitly we draw them in pairs.  Some nodes such as GeneratorExp
+    # must be parenthesized, in which case we keep at least the default parens.
+    if dict(kwargs).get("lpar", infer) is infer and _default_parens(t) is not None:
+        pairs = draw(_paren_pairs(_default_parens(t)))
+        values["lpar"] = [lpar for lpar, _ in pairs]
+        values["rpar"] = [rpar for _, rpar in pairs]
+    collector = stats.current()
+    # `draw` is the bound method of the ConjectureData we're drawing from.
+    length = draw.__self__.length
+    try:
+        fields = draw(_fields_strategy(t, kwargs, tuple(values)))
+        return t(**fields, **values)
+    except libcst.CSTValidationError:
+        if collector is not None:
+            collector.record_rejection("cst", t.__name__, "CSTValidationError")
+        assume(False)
+    finally:
+        if collector is not None:
+            length = draw.__self__.length - length
+            collector.record_draw("cst", t.__name__, length)
+
+
+@lru_cache(maxsize=None)
+def _fields_strategy(
+    t: Type[libcst.CSTNode],
+    kwargs: Tuple[Tuple[str, Any], ...],
+    given: Tuple[str, ...],
+) -> st.SearchStrategy:
+    """Return a strategy for the fields of t which aren't given.
+
+    We infer each required field or field passed as `infer` as `st.builds()` would,
+    but build the strategy once for each node type rather than for every node.
+    """
+    hints = get_type_hints(t)
+    sequences = _short_sequences(t)
+    strategies = {name: s for name, s in kwargs if name not in given}
+    for field in dataclasses.fields(t):
+        required = field.default is field.default_factory is dataclasses.MISSING
+        if (
+            field.name in given
+            or strategies.get(field.name, infer if required else None) is not infer
+        ):
+            continue
+        if field.name in sequences:
+            strategies[field.name] = sequences[field.name]
+        else:
+            strategies[field.name] = st.from_type(hints[field.name])
+    return st.fixed_dictionaries(strategies)
+
+
+@lru_cache(maxsize=None)
+def _paren_pairs(min_size: int) -> st.SearchStrategy:
+    return st.lists(
+        st.tuples(st.from_type(libcst.LeftParen), st.from_type(libcst.RightParen)),
+        min_size=min_size,
+        max_size=2,
     )
-    | st.builds(
-        libcst.Assert,
-        test=infer,
-        whitespace_after_assert=nonempty_whitespace,
-        comma=st.from_type(libcst.Comma),
-        msg=st.from_type(libcst.BaseExpression),
-        semicolon=infer,
-    ),
-)
 
-# either posargs, kwargs, or **args, but only one at a time
-st.register_type_strategy(
-    libcst.Arg,
-    st.builds(
-        libcst.Arg,
-        value=infer,
-        comma=infer,
-        star=infer,
-        whitespace_after_star=infer,
-        whitespace_after_arg=infer,
-    )
-    | st.builds(
-        libcst.Arg,
-        value=infer,
-        keyword=st.from_type(libcst.Name),
-        equal=st.from_type(libcst.AssignEqual),
-        comma=infer,
-        star=st.just(""),
-        whitespace_after_arg=infer,
-    ),
-)
+
+@lru_cache(maxsize=None)
+def _default_parens(t: Type[libcst.CSTNode]) -> Optional[int]:
+    """Return the default number of parens around nodes of type t, if any."""
+    fields = {f.name: f for f in dataclasses.fields(t)}
+    if "lpar" not in fields or "rpar" not in fields:
+        return None
+    field = fields["lpar"]
+    if field.default_factory is not dataclasses.MISSING:
+        return len(field.default_factory())
+    if isinstance(field.default, Sequence):
+        return len(field.default)
+    return None
+
+
+@lru_cache(maxsize=None)
+def _short_sequences(t: Type[libcst.CSTNode]) -> Dict[str, st.SearchStrategy]:
+    """Return a strategy with at most a few items for each sequence field of t."""
+    hints = get_type_hints(t)
+    return {
+        field.name: st.lists(
+            st.from_type(get_args(hints[field.name])[0]), max_size=MAX_SEQUENCE_SIZE
+        )
+        for field in dataclasses.fields(t)
+        if get_origin(hints[field.name]) is collections.abc.Sequence
+    }
+
+
+def with_space_if_needed(node, attr, neighbour, position):  # type: ignore
+    # Word operators like `and` or `in` need whitespace between them and some
+    # neighbouring expressions, e.g. `a or b` whereas `(1)or(2)` is OK.
+    if getattr(node, attr).empty and not neighbour._safe_to_use_with_word_operator(
+        position
+    ):
+        return node.with_changes(**{attr: libcst.SimpleWhitespace(" ")})
+    return node
 
 
 @st.composite
 def boolean_op_with_whitespace(draw):  # type: ignore
-    # for BooleanOperation, some expressions require whitespace before
-    # and/or after e.g. a or b whereas (1)or(2) is OK.
     left = draw(st.from_type(libcst.BaseExpression))
     right = draw(st.from_type(libcst.BaseExpression))
     op = draw(st.from_type(libcst.BaseBooleanOp))
-    if op.whitespace_before.empty and not left._safe_to_use_with_word_operator(
-        ExpressionPosition.LEFT
-    ):  # pragma: no cover
-        op = op.with_changes(whitespace_before=libcst.SimpleWhitespace(" "))
-    if op.whitespace_after.empty and not right._safe_to_use_with_word_operator(
-        ExpressionPosition.RIGHT
-    ):  # pragma: no cover
-        op = op.with_changes(whitespace_after=libcst.SimpleWhitespace(" "))
+    op = with_space_if_needed(op, "whitespace_before", left, ExpressionPosition.LEFT)
+    op = with_space_if_needed(op, "whitespace_after", right, ExpressionPosition.RIGHT)
     return libcst.BooleanOperation(left, op, right)
 
 
-st.register_type_strategy(libcst.BooleanOperation, boolean_op_with_whitespace())
+@st.composite
+def comparison_with_whitespace(draw):  # type: ignore
+    # As for BooleanOperation, but `in`, `not in`, `is`, and `is not` are the only
+    # comparison operators which need whitespace.
+    left = previous = draw(st.from_type(libcst.BaseExpression))
+    comparisons = []
+    for op, right in draw(
+        st.lists(
+            st.tuples(
+                st.from_type(libcst.BaseCompOp), st.from_type(libcst.BaseExpression)
+            ),
+            min_size=1,
+            max_size=MAX_SEQUENCE_SIZE,
+        )
+    ):
+        if isinstance(op, (libcst.In, libcst.NotIn, libcst.Is, libcst.IsNot)):
+            op = with_space_if_needed(
+                op, "whitespace_before", previous, ExpressionPosition.LEFT
+            )
+            op = with_space_if_needed(
+                op, "whitespace_after", right, ExpressionPosition.RIGHT
+            )
+        comparisons.append(libcst.ComparisonTarget(op, right))
+        previous = right
+    return libcst.Comparison(left, comparisons)
+
 
-st.register_type_strategy(
-    libcst.ComparisonTarget, builds_filtering(libcst.ComparisonTarget)
-)
+@st.composite
+def in_scope(draw, strategy, enter):  # type: ignore
+    # Draw from strategy in the scope entered from the current one, e.g. the body
+    # of a function.  Strategies are drawn depth-first, so a stack is enough.
+    _scopes.append(enter(_scopes[-1]))
+    try:
+        return draw(strategy)
+    finally:
+        _scopes.pop()
+
+
+@st.composite
+def _one_of_in_scope(draw, types):  # type: ignore
+    return draw(_types_in_scope(types, _scopes[-1]))
+
+
+@lru_cache(maxsize=None)
+def _types_in_scope(
+    types: Tuple[Type[libcst.CSTNode], ...], scope: scopes.Scope
+) -> st.SearchStrategy:
+    return st.one_of(
+        *(st.from_type(t) for t in types if scopes.allows(scope, SCOPED_NODES.get(t)))
+    )
+
+
+def one_of_types(types: Sequence[Type[libcst.CSTNode]]) -> st.SearchStrategy:
+    """Return a strategy for any of these node types which is valid where drawn."""
+    if any(t in SCOPED_NODES for t in types):
+        return _one_of_in_scope(tuple(types))
+    return st.one_of(*map(st.from_type, types))
+
+
+@st.composite
+def function_def(draw):  # type: ignore
+    # We decide whether the function is async before drawing its body, so that
+    # e.g. `await` is only used in the body of an async function.
+    asynchronous = draw(st.none() | st.from_type(libcst.Asynchronous))
+    enter = partial(scopes.function_body, is_async=asynchronous is not None)
+    body = draw(in_scope(st.from_type(libcst.BaseSuite), enter))
+    return build_node(
+        draw, libcst.FunctionDef, (), body=body, asynchronous=asynchronous
+    )
+
+
+@st.composite
+def mostly_leaves(draw, leaves, compound):  # type: ignore
+    # Hypothesis flattens nested calls to `st.one_of()`, so we choose between leaf
+    # and compound nodes here.  Most compound nodes contain two or more others, so
+    # if we chose them more often than this almost every example would exceed
+    # Hypothesis' maximum depth.
+    if draw(st.integers(0, 7)) == 7:
+        return draw(compound)
+    return draw(leaves)
+
+
+def register_mostly_leaves(
+    base: Type[libcst.CSTNode], leaves: List[Type[libcst.CSTNode]]
+) -> None:
+    nodes = [
+        t
+        for t in _global_type_lookup
+        if isinstance(t, type) and issubclass(t, base) and not isabstract(t)
+    ]
+    # Hypothesis only resolves an abstract type to its registered subtypes which
+    # are not also subtypes of another registered type, so once `base` is
+    # registered we need to handle e.g. BaseAssignTargetExpression ourselves.
+    for abstract in {
+        b
+        for t in nodes
+        for b in t.__mro__
+        if issubclass(b, base) and b not in _global_type_lookup
+    }:
+        subtypes = [t for t in nodes if issubclass(t, abstract)]
+        strategy = one_of_types(subtypes)
+        if any(t in leaves for t in subtypes) and any(
+            t not in leaves for t in subtypes
+        ):
+            strategy = mostly_leaves(
+                one_of_types([t for t in subtypes if t in leaves]),
+                one_of_types([t for t in subtypes if t not in leaves]),
+            )
+        st.register_type_strategy(abstract, strategy)
+
+
+_registration_started = False
+
+
+def register_strategies() -> None:
+    """Teach ``st.from_type()`` to generate valid instances of each LibCST node type.
+
+    Building and registering all these strategies is relatively slow, so we defer it
+    until the first call to ``from_node()`` or ``st.from_type()`` for a node type.
+    """
+    global _registration_started
+    if _registration_started:
+        return
+    _registration_started = True
+    # Remove our placeholders first, so that node types which we haven't registered
+    # yet are resolved exactly as if we had never touched them.
+    for t, strategy in list(_global_type_lookup.items()):
+        if strategy is _register_on_first_use:
+            del _global_type_lookup[t]
+
+    # `from_type()` resolves strategies as soon as it's called, so we start by
+    # registering a fallback for every node type and then override them below.
+    # Otherwise, referring to a node type before we register it would get the default
+    # strategy from Hypothesis, which infers every field independently - unbalanced
+    # parens, missing whitespace around keywords, and so on.
+    for t in vars(libcst).values():
+        if (
+            isinstance(t, type)
+            and not isabstract(t)
+            and issubclass(t, libcst.CSTNode)
+            and t not in _global_type_lookup
+        ):
+            st.register_type_strategy(t, builds_filtering(t))
+
+    # For some nodes, we just need to ensure that they use a valid literal or the
+    # appropriate regex pattern instead of allowing literally any string.
+    for node_type, values in {
+        libcst.Float: float_literals(),
+        libcst.Integer: integer_literals(),
+        libcst.Imaginary: imaginary_literals(),
+        libcst.SimpleWhitespace: regex_strategy(
+            libcst._nodes.whitespace.SIMPLE_WHITESPACE_RE
+        ),
+    }.items():
+        st.register_type_strategy(node_type, st.builds(node_type, values))
+
+    # type-ignore comments are special in the 3.8+ (typed) ast, so boost their chances)
+    _comments = regex_strategy(libcst._nodes.whitespace.COMMENT_RE)
+    st.register_type_strategy(
+        libcst.Comment, st.builds(libcst.Comment, _comments | st.just("# type: ignore"))
+    )
+
+    # `from_type()` has less laziness than other strategies, we we register for these
+    # foundational node types *before* referring to them in other strategies.
+    st.register_type_strategy(libcst.Name, st.builds(libcst.Name, identifiers()))
+    st.register_type_strategy(
+        libcst.SimpleString, st.builds(libcst.SimpleString, st.text().map(repr))
+    )
+
+    # Ensure that ImportAlias uses Attribute nodes composed only of Name nodes.
+    names = st.from_type(libcst.Name)
+    name_only_attributes = st.one_of(
+        names,
+        st.builds(libcst.Attribute, names, names),
+        st.builds(libcst.Attribute, st.builds(libcst.Attribute, names, names), names),
+    )
+    st.register_type_strategy(
+        libcst.ImportAlias, st.builds(libcst.ImportAlias, name_only_attributes)
+    )
+    # ...but `from module import name` can't have dotted names after the import.
+    from_import_names = without_trailing_comma(
+        st.lists(
+            st.builds(libcst.ImportAlias, names), min_size=1, max_size=MAX_SEQUENCE_SIZE
+        )
+    )
+
+    # There are around 150 concrete types of CST nodes.  Delightfully, libCST uses
+    # dataclasses for all these classes, so we can allow the `builds` & `from_type`
+    # inference to provide most of our arguments for us.
+    # However, in some cases we want to either restrict arguments (e.g. libcst.Name),
+    # or supply something nastier than the default argument (e.g. libcst.SimpleWhitespace)
+    nonempty_whitespace = st.builds(libcst.SimpleWhitespace, regex_strategy(" +"))
+    # Strings can't be parenthesized if they're part of a ConcatenatedString
+    unparenthesized_strings = st.from_type(libcst.SimpleString) | builds_filtering(
+        libcst.FormattedString, lpar=st.just(())
+    )
+    # The literal parts of f-strings can't contain quotes, newlines, or lone braces
+    formatted_string_text = st.text(
+        st.characters(codec="utf-8", min_codepoint=1, exclude_characters="{}\\'\"\r\n")
+    )
+    # Lambda parameters can't have annotations, and we leave out defaults so that
+    # they're always in a valid order.  Duplicate parameter names are an error.
+    st.register_type_strategy(
+        libcst.Parameters,
+        st.builds(
+            libcst.Parameters,
+            st.lists(
+                st.builds(libcst.Param, st.from_type(libcst.Name)),
+                max_size=MAX_SEQUENCE_SIZE,
+                unique_by=lambda param: param.name.value,
+            ),
+        ),
+    )
+    # The bodies of functions, classes, loops, and comprehensions are each in a new
+    # scope, which determines e.g. whether they can contain `return` or `break`.
+    st.register_type_strategy(libcst.FunctionDef, function_def())
+    class_suite = in_scope(st.from_type(libcst.BaseSuite), scopes.class_body)
+    loop_suite = in_scope(st.from_type(libcst.BaseSuite), scopes.loop_body)
+    lambda_body = in_scope(st.from_type(libcst.BaseExpression), scopes.lambda_body)
+    comprehension_expr = in_scope(
+        st.from_type(libcst.BaseExpression), scopes.comprehension
+    )
+    REGISTERED = (
+        [libcst.Asynchronous, nonempty_whitespace],
+        [libcst.AsName, st.from_type(libcst.Name)],
+        [libcst.AnnAssign, infer, infer, infer],
+        [libcst.Assign, nonempty_seq(libcst.AssignTarget)],
+        [libcst.Await, infer, st.just(()), st.just(()), nonempty_whitespace],
+        [libcst.Attribute, infer, infer, infer],
+        [libcst.Decorator, st.from_type(libcst.Name) | st.from_type(libcst.Attribute)],
+        [libcst.EmptyLine, infer, infer, infer],
+        [libcst.FormattedStringText, formatted_string_text],
+        [
+            libcst.Call,
+            infer,
+            sequence_of(libcst.Arg).map(lambda args: sorted(args, key=call_arg_order)),
+        ],
+        [
+            libcst.ConcatenatedString,
+            unparenthesized_strings,
+            unparenthesized_strings,
+            infer,
+            infer,
+            nonempty_whitespace,  # so that e.g. '' '' doesn't become ''''
+        ],
+        [libcst.Global, without_trailing_comma(nonempty_seq(libcst.NameItem))],
+        [libcst.Import, without_trailing_comma(nonempty_seq(libcst.ImportAlias))],
+        [
+            libcst.ImportFrom,
+            name_only_attributes,
+            from_import_names,
+        ],
+        [libcst.IndentedBlock, infer, infer, regex_strategy(_INDENT_WHITESPACE_RE)],
+        [libcst.IsNot, infer, nonempty_whitespace, infer],
+        [libcst.ClassDef, infer, class_suite],
+        [libcst.DictComp, comprehension_expr, comprehension_expr],
+        [libcst.For, infer, infer, loop_suite],
+        [libcst.GeneratorExp, comprehension_expr],
+        [libcst.Lambda, st.from_type(libcst.Parameters), lambda_body],
+        [libcst.ListComp, comprehension_expr],
+        [libcst.Match, infer, nonempty_seq(libcst.MatchCase)],
+        [
+            libcst.MatchSingleton,
+            st.builds(libcst.Name, st.sampled_from(["None", "False", "True"])),
+        ],
+        [libcst.NamedExpr, st.from_type(libcst.Name)],
+        [libcst.Nonlocal, without_trailing_comma(nonempty_seq(libcst.NameItem))],
+        [libcst.NotEqual, st.just("!=")],
+        [libcst.NotIn, infer, nonempty_whitespace, infer],
+        [libcst.Set, nonempty_seq(libcst.Element, libcst.StarredElement)],
+        [libcst.SetComp, comprehension_expr],
+        [libcst.StarredElement, infer, infer, st.just(()), st.just(())],
+        [libcst.Subscript, infer, nonempty_seq(libcst.SubscriptElement)],
+        [libcst.TrailingWhitespace, infer, infer],
+        [libcst.TryStar, infer, nonempty_seq(libcst.ExceptStarHandler)],
+        [libcst.While, infer, loop_suite],
+        [libcst.Tuple, nonempty_seq(libcst.Element, libcst.StarredElement)],
+        [libcst.With, without_trailing_comma(nonempty_seq(libcst.WithItem))],
+    )
+
+    # This is where the magic happens: teach `st.from_type` to generate each node type
+    for node_type, *strats in REGISTERED:
+        # TODO: once everything else is working, come back here and use `infer` for
+        # all arguments without an explicit strategy - inference is more "interesting"
+        # than just using the default argument... in the proverbial sense.
+        # Mostly this will consist of ensuring that parens remain balanced.
+        args = [name for name in getfullargspec(node_type).args if name != "self"]
+        kwargs = dict(zip(args, strats))
+        st.register_type_strategy(node_type, builds_filtering(node_type, **kwargs))
+
+    st.register_type_strategy(libcst.BooleanOperation, boolean_op_with_whitespace())
+    st.register_type_strategy(libcst.Comparison, comparison_with_whitespace())
+
+    # Most kinds of expression contain several others, so we usually choose a leaf.
+    # This must be registered after the compound expressions, but before the
+    # strategies below which resolve `infer` for expressions immediately.
+    register_mostly_leaves(
+        libcst.BaseExpression,
+        [
+            libcst.Name,
+            libcst.Integer,
+            libcst.Float,
+            libcst.Imaginary,
+            libcst.SimpleString,
+            libcst.Ellipsis,
+        ],
+    )
+
+    # We have special handling for `Try` nodes, because there are two options.
+    # If a Try node has no `except` clause, it *must* have a `finally` clause and
+    # *must not* have an `else` clause.  With one or more except clauses, it may
+    # have an else and/or a finally, or neither.
+    # The .map() ensures that any bare-`except:` clauses are ordered last.
+    st.register_type_strategy(
+        libcst.Try,
+        st.builds(libcst.Try, finalbody=st.from_type(libcst.Finally))
+        | st.builds(
+            libcst.Try,
+            body=infer,
+            handlers=st.lists(
+                st.deferred(lambda: st.from_type(libcst.ExceptHandler)),
+                min_size=1,
+                max_size=MAX_SEQUENCE_SIZE,
+                unique_by=lambda caught: caught.type,
+            ).map(lambda xs: sorted(xs, key=lambda x: x.type is None)),
+            orelse=infer,
+            finalbody=infer,
+        ),
+    )
 
+    # ExceptHandler can only have a name if it also has a type
+    st.register_type_strategy(
+        libcst.ExceptHandler,
+        st.builds(
+            libcst.ExceptHandler,
+            body=infer,
+            whitespace_after_except=nonempty_whitespace,
+            whitespace_before_colon=infer,
+        )
+        | st.builds(
+            libcst.ExceptHandler,
+            body=infer,
+            type=st.from_type(libcst.BaseExpression),
+            name=infer,
+            leading_lines=infer,
+            whitespace_after_except=nonempty_whitespace,
+            whitespace_before_colon=infer,
+        ),
+    )
 
-# TODO: this works pretty well, but it's also a pretty poor trick for performance.
-#       Instead of filtering, we should continue expanding the specific node
-#       strategies as used above in order to generate valid things by construction.
+    # Assert can either have a comma and message, or neither
+    st.register_type_strategy(
+        libcst.Assert,
+        st.builds(
+            libcst.Assert,
+            test=infer,
+            whitespace_after_assert=nonempty_whitespace,
+            semicolon=infer,
+        )
+        | st.builds(
+            libcst.Assert,
+            test=infer,
+            whitespace_after_assert=nonempty_whitespace,
+            comma=st.from_type(libcst.Comma),
+            msg=st.from_type(libcst.BaseExpression),
+            semicolon=infer,
+        ),
+    )
+
+    # either posargs, kwargs, or **args, but only one at a time
+    st.register_type_strategy(
+        libcst.Arg,
+        st.builds(
+            libcst.Arg,
+            value=infer,
+            comma=infer,
+            star=infer,
+            whitespace_after_star=infer,
+            whitespace_after_arg=infer,
+        )
+        | st.builds(
+            libcst.Arg,
+            value=infer,
+            keyword=st.from_type(libcst.Name),
+            equal=st.from_type(libcst.AssignEqual),
+            comma=infer,
+            star=st.just(""),
+            whitespace_after_arg=infer,
+        ),
+    )
+
+    # And likewise for statements and patterns, now that they're all registered.
+    register_mostly_leaves(libcst.BaseStatement, [libcst.SimpleStatementLine])
+    st.register_type_strategy(
+        libcst.BaseSmallStatement,
+        one_of_types(
+            [
+                t
+                for t in _global_type_lookup
+                if isinstance(t, type)
+                and issubclass(t, libcst.BaseSmallStatement)
+                and not isabstract(t)
+            ]
+        ),
+    )
+    register_mostly_leaves(
+        libcst.MatchPattern, [libcst.MatchValue, libcst.MatchSingleton]
+    )
+
+
+def _register_on_first_use(thing):  # type: ignore
+    register_strategies()
+    return st.from_type(thing)
+
+
+# Register a cheap placeholder for each node type, so that `st.from_type()` will
+# trigger registration of the real strategies if it is called before `from_node()`.
 for t in vars(libcst).values():
     if (
         isinstance(t, type)
@@ -233,47 +637,132 @@ for t in vars(libcst).values():
         and issubclass(t, libcst.CSTNode)
         and t not in _global_type_lookup
     ):
-        st.register_type_strategy(t, builds_filtering(t))
-
-
-def record_targets(code: str) -> str:
-    # target larger inputs - the Hypothesis engine will do a multi-objective
-    # hill-climbing search using these scores to generate 'better' examples.
-    nodes = list(ast.walk(ast.parse(code)))
-    uniq_nodes = {type(n) for n in nodes}
-    instructions = list(dis.Bytecode(compile(code, "<string>", "exec")))
-    for value, label in [
-        (len(instructions), "(hypothesmith from_node) instructions in bytecode"),
-        (len(nodes), "(hypothesmith from_node) total number of ast nodes"),
-        (len(uniq_nodes), "(hypothesmith from_node) number of unique ast node types"),
-    ]:
-        target(float(value), label=label)
-    return code
+        st.register_type_strategy(t, _register_on_first_use)
+
+
+def record_targets(
+    code: str,
+    mode: str = "exec",
+    *,
+    node: str = "",
+    prefix: str = "hypothesmith from_node",
+) -> bool:
+    # This is a filter like `compilable()`, but also measures the code - reusing
+    # the compiled AST and bytecode - and uses that to target larger inputs; the
+    # Hypothesis engine will do a multi-objective hill-climbing search using these
+    # scores to generate 'better' examples.
+    return check_generated(GeneratedSource(code, mode), node=node, prefix=prefix)
+
+
+def check_generated(
+    generated: GeneratedSource,
+    *,
+    auto_target: bool = True,
+    node: str = "",
+    prefix: str = "hypothesmith from_node",
+) -> bool:
+    # As for `record_targets()`, but the AST and bytecode are kept on `generated`
+    # to hand on to the caller.
+    collector = stats.current()
+    start = perf_counter()
+    try:
+        tree, compiled = generated.tree, generated.code
+    except (SyntaxError, ValueError) as err:
+        if collector is not None:
+            collector.record_rejection("cst", node, type(err).__name__)
+        return False
+    finally:
+        if collector is not None:
+            collector.record_compile("cst", node, perf_counter() - start)
+    if auto_target:
+        for value, label in measure(tree, compiled).targets(prefix):
+            target(value, label=label)
+    return True
 
 
-def compilable(code: str, mode: str = "exec") -> bool:
+def compilable(code: str, mode: str = "exec", *, node: str = "") -> bool:
     # This is used as a filter on `from_node()`, but note that LibCST aspires to
     # disallow construction of a CST node which is converted to invalid code.
     # (that is, if the resulting code would be invalid, raise an error instead)
     # See also https://github.com/Instagram/LibCST/issues/287
-    try:
-        compile(code, "<string>", mode)
-        return True
-    except (SyntaxError, ValueError):
-        return False
+    # We only need to know whether the code compiles, so short fragments which
+    # were checked recently skip the compiler - see `hypothesmith.validity`.
+    collector = stats.current()
+    cause = validity.cache.get(code, mode)
+    if cause is None:
+        start = perf_counter()
+        try:
+            compile(code, "<string>", mode)
+            cause = ""
+        except (SyntaxError, ValueError) as err:
+            cause = type(err).__name__
+        finally:
+            if collector is not None:
+                collector.record_compile("cst", node, perf_counter() - start)
+        validity.cache.put(code, mode, 0, cause)
+    if cause and collector is not None:
+        collector.record_rejection("cst", node, cause)
+    return not cause
 
 
 def from_node(
-    node: Type[libcst.CSTNode] = libcst.Module, *, auto_target: bool = True
-) -> st.SearchStrategy[str]:
+    node: Type[libcst.CSTNode] = libcst.Module,
+    *,
+    auto_target: bool = True,
+    output: str = "source",
+) -> st.SearchStrategy[Any]:
     """Generate syntactically-valid Python source code for a LibCST node type.
 
-    You can pass any subtype of `libcst.CSTNode`.  Alternatively, you can use
-    Hypothesis' built-in `from_type(node_type).map(lambda n: libcst.Module([n]).code`,
-    after Hypothesmith has registered the required strategies.  However, this does
-    not include automatic targeting and limitations of LibCST may lead to invalid
-    code being generated.
+    You can pass any subtype of `libcst.CSTNode`.  Code for expressions is valid on
+    its own, i.e. for `eval()`, and code for other nodes is valid as a module.
+    As for `from_grammar()`, pass `output="ast"` or `output="generated"` to get the
+    syntax tree or a `GeneratedSource` object, whose `cst` is the node we drew.
+
+    Alternatively, you can use Hypothesis' built-in
+    `from_type(node_type).map(lambda n: libcst.Module([n]).code`, after importing
+    `hypothesmith.cst` to register the required strategies.  However, this does not
+    include automatic targeting and limitations of LibCST may lead to invalid code
+    being generated.
     """
     assert issubclass(node, libcst.CSTNode)
-    code = st.from_type(node).map(lambda n: libcst.Module([n]).code).filter(compilable)
-    return code.map(record_targets) if auto_target else code
+    assert output in OUTPUTS, output
+    register_strategies()
+    return _get_strategy(node, auto_target, output)
+
+
+# We render each node with the default config of an empty module, rather than
+# building a new module around every node we draw.
+EMPTY_MODULE = libcst.Module([])
+
+
+def compile_mode(node: Type[libcst.CSTNode]) -> str:
+    """Return the mode in which to compile code for a node type.
+
+    Expressions are checked on their own, in "eval" mode - which is a little faster
+    than compiling them as statements, and rejects code like `*a,` which is only
+    valid as a statement.  Everything else, i.e. statements and modules, is checked
+    as a module.
+    """
+    return "eval" if issubclass(node, libcst.BaseExpression) else "exec"
+
+
+def generated_from_node(node: libcst.CSTNode, mode: str) -> GeneratedSource:
+    return GeneratedSource(EMPTY_MODULE.code_for_node(node), mode, cst=node)
+
+
+@lru_cache(maxsize=None)
+def _get_strategy(
+    node: Type[libcst.CSTNode], auto_target: bool, output: str = "source"
+) -> st.SearchStrategy[Any]:
+    # Sharing one strategy object between calls saves building and validating a new
+    # one for each test, and lets Hypothesis reuse its caches for that strategy.
+    mode = compile_mode(node)
+    if output == "source":
+        code = st.from_type(node).map(EMPTY_MODULE.code_for_node)
+        check = record_targets if auto_target else compilable
+        return code.filter(partial(check, mode=mode, node=node.__name__))
+    generated = st.from_type(node).map(partial(generated_from_node, mode=mode))
+    strategy = generated.filter(
+        partial(check_generated, auto_target=auto_target, node=node.__name__)
+    )
+    return strategy.map(attrgetter("tree")) if output == "ast" else strategy
@@ -0,0 +1,94 @@
+"""Generated programs along with their syntax trees and code objects.
+
+Our strategies parse and compile every example to check that it's valid, and many
+tests then parse the same source code again.  Instead, ``output="ast"`` or
+``output="generated"`` hands our work on to the test.
+"""
+
+import ast
+from types import CodeType
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    import libcst
+
+OUTPUTS = ("source", "ast", "generated")
+
+
+class GeneratedSource:
+    """Generated source code, with the results of parsing and compiling it.
+
+    ``tree`` is the ``ast`` tree, ``code`` the compiled code object, and ``cst``
+    the LibCST node; each is computed when first accessed unless we already have
+    it.  From ``from_node()``, ``cst`` is the node we drew; otherwise it's parsed
+    with LibCST, which may not support every program that Python does.
+    """
+
+    __slots__ = ("source", "mode", "_tree", "_code", "_cst")
+
+    def __init__(
+        self,
+        source: str,
+        mode: str = "exec",
+        *,
+        tree: Optional[ast.AST] = None,
+        code: Optional[CodeType] = None,
+        cst: Optional["libcst.CSTNode"] = None,
+    ) -> None:
+        self.source = source
+        self.mode = mode
+        self._tree = tree
+        self._code = code
+        self._cst = cst
+
+    def __repr__(self) -> str:
+        return f"GeneratedSource({self.source!r}, mode={self.mode!r})"
+
+    def __str__(self) -> str:
+        return self.source
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, GeneratedSource):
+            return NotImplemented
+        return (self.source, self.mode) == (other.source, other.mode)
+
+    def __hash__(self) -> int:
+        return hash((self.source, self.mode))
+
+    @property
+    def tree(self) -> ast.AST:
+        if self._tree is None:
+            self._tree = compile(self.source, "<string>", self.mode, ast.PyCF_ONLY_AST)
+        return self._tree
+
+    @property
+    def code(self) -> CodeType:
+        if self._code is None:
+            self._code = compile(self.tree, "<string>", self.mode)
+        return self._code
+
+    @property
+    def cst(self) -> "libcst.CSTNode":
+        if self._cst is None:
+            # Imported here, so that from_grammar() still never imports LibCST.
+            import libcst
+
+            if self.mode == "eval":
+                self._cst = libcst.parse_expression(self.source)
+            else:
+                self._cst = libcst.parse_module(self.source)
+        return self._cst
+
+
+def make_output(
+    output: str,
+    source: str,
+    mode: str,
+    tree: Optional[ast.AST] = None,
+    code: Optional[CodeType] = None,
+) -> Any:
+    """Return source, its ast tree, or a GeneratedSource, according to output."""
+    if output == "source":
+        return source
+    generated = GeneratedSource(source, mode, tree=tree, code=code)
+    return generated.tree if output == "ast" else generated
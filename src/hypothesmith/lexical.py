@@ -0,0 +1,394 @@
+"""Strategies for individual Python tokens, which are valid by construction."""
+
+import keyword
+import operator
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+from token import (
+    COMMENT,
+    DEDENT,
+    ENDMARKER,
+    EXACT_TOKEN_TYPES,
+    INDENT,
+    NAME,
+    NEWLINE,
+    NL,
+    NUMBER,
+    OP,
+    STRING,
+)
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Pattern, Tuple, Union
+
+from hypothesis import strategies as st
+
+Exceptions = Dict[Tuple[str, ...], Tuple[List[str], List[str]]]
+
+KEYWORDS = frozenset(keyword.kwlist)
+# `keyword.softkwlist` is new in Python 3.9
+SOFT_KEYWORDS = frozenset(getattr(keyword, "softkwlist", ()))
+
+# Unicode defines XID_Start and XID_Continue mostly in terms of these general
+# categories, with a few exceptions.
+START_CATEGORIES = ("Lu", "Ll", "Lt", "Lm", "Lo", "Nl")
+CONTINUE_CATEGORIES = START_CATEGORIES + ("Mn", "Mc", "Nd", "Pc")
+# Every character which is an exception in any version of Unicode up to this one,
+# found by checking every codepoint on Python 3.9 to 3.13.  Unicode's identifier
+# stability policy means exceptions are only ever added, so on older versions we
+# just check which of these still apply.
+EXCEPTIONS_UNICODE_VERSION = "15.1.0"
+EXCEPTIONAL_CHARACTERS = (
+    "_\u00b7\u037a\u0387\u0e33\u0eb3\u1369\u136a\u136b\u136c\u136d\u136e"
+    "\u136f\u1370\u1371\u1885\u1886\u19da\u200c\u200d\u2118\u212e\u2e2f\u30fb"
+    "\ufc5e\ufc5f\ufc60\ufc61\ufc62\ufc63\ufdfa\ufdfb\ufe70\ufe72\ufe74\ufe76"
+    "\ufe78\ufe7a\ufe7c\ufe7e\uff65\uff9e\uff9f"
+)
+ALLOWED_CHARS = st.characters(codec="utf-8", min_codepoint=1)
+# Before Python 3.12, tokenize only matches names made of `\w` characters - so e.g.
+# `a\u0300` (with a combining accent) is a valid identifier, but tokenized as the
+# name `a` followed by an error token.
+WORD_CHAR = re.compile(r"\w")
+TOKENIZE_WORDS_ONLY = sys.version_info < (3, 12)
+
+DIGITS = "0123456789"
+# The prefix letters and digits for integer literals in each base except ten.
+RADIXES = {16: ("xX", DIGITS + "abcdefABCDEF"), 8: ("oO", "01234567"), 2: ("bB", "01")}
+
+
+def _unicode_version(version: str) -> Tuple[int, ...]:
+    return tuple(map(int, version.split(".")))
+
+
+@lru_cache(maxsize=None)
+def identifier_exceptions() -> Exceptions:
+    """Map categories to (include, exclude) lists of exceptional characters.
+
+    For example, U+FDFA is in category Lo but is not XID_Start because it normalizes
+    to several words separated by spaces, while U+2118 is XID_Start but in category
+    Sm.  Checking every codepoint takes seconds, so unless this Python has a newer
+    version of Unicode than ``EXCEPTIONS_UNICODE_VERSION`` we only check the
+    characters in ``EXCEPTIONAL_CHARACTERS``.
+    """
+    if _unicode_version(unicodedata.unidata_version) > _unicode_version(
+        EXCEPTIONS_UNICODE_VERSION
+    ):
+        candidates: Iterable[str] = map(chr, range(sys.maxunicode + 1))
+    else:
+        candidates = EXCEPTIONAL_CHARACTERS
+    exceptions: Exceptions = {
+        START_CATEGORIES: ([], []),
+        CONTINUE_CATEGORIES: ([], []),
+    }
+    for char in candidates:
+        category = unicodedata.category(char)
+        for categories, valid in [
+            (START_CATEGORIES, char.isidentifier()),
+            (CONTINUE_CATEGORIES, ("a" + char).isidentifier()),
+        ]:
+            if valid != (category in categories):
+                include, exclude = exceptions[categories]
+                (include if valid else exclude).append(char)
+    return exceptions
+
+
+@lru_cache(maxsize=None)
+def identifier_characters() -> Tuple[st.SearchStrategy[str], st.SearchStrategy[str]]:
+    """Return strategies for the first and subsequent characters of identifiers."""
+    start, cont = (
+        st.characters(
+            categories=categories,
+            include_characters="".join(include),
+            exclude_characters="".join(exclude),
+        )
+        for categories, (include, exclude) in identifier_exceptions().items()
+    )
+    return start, cont
+
+
+@lru_cache(maxsize=None)
+def _any_identifier(word_chars_only: bool) -> st.SearchStrategy[str]:
+    start, cont = identifier_characters()
+    if word_chars_only:
+        start, cont = (chars.filter(WORD_CHAR.fullmatch) for chars in (start, cont))
+    return st.builds(operator.add, start, st.text(cont))
+
+
+def _identifiers(
+    excluded: FrozenSet[str], word_chars_only: bool
+) -> st.SearchStrategy[str]:
+    # Deferred so that we only build the tables when generating identifiers.
+    return st.deferred(lambda: _any_identifier(word_chars_only)).filter(
+        lambda name: name not in excluded
+    )
+
+
+def identifiers(*, exclude_soft_keywords: bool = False) -> st.SearchStrategy[str]:
+    """Generate valid Python identifiers, which are never keywords.
+
+    Unlike ``st.text().filter(str.isidentifier)``, we build each identifier from
+    tables of valid characters, so almost no draws are rejected.  If
+    ``exclude_soft_keywords`` is True, we also avoid e.g. ``match`` and ``case``.
+    """
+    excluded = KEYWORDS | SOFT_KEYWORDS if exclude_soft_keywords else KEYWORDS
+    return _identifiers(excluded, word_chars_only=False)
+
+
+@lru_cache(maxsize=None)
+def regex_strategy(
+    pattern: Union[str, Pattern[str]],
+    alphabet: st.SearchStrategy[str] = ALLOWED_CHARS,
+) -> st.SearchStrategy[str]:
+    """Return a strategy for strings which fullmatch pattern, drawn from alphabet.
+
+    Converting a regex to a strategy means parsing the pattern and building a
+    strategy for each part of it, so we share one strategy for each pattern and
+    alphabet rather than repeating that work for every node type or grammar.
+    """
+    return st.from_regex(pattern, fullmatch=True, alphabet=alphabet)
+
+
+def _underscored(digits: str) -> st.SearchStrategy[str]:
+    # Matches `("_"? [digits])*`, i.e. digits with single underscores between them.
+    # Drawing text and then tidying up underscores is much cheaper than drawing a
+    # list of optional underscores and digits.
+    return st.text(digits + "_").map(lambda s: re.sub("_+", "_", s).rstrip("_"))
+
+
+def _prefixed(prefixes: str, rest: st.SearchStrategy[str]) -> st.SearchStrategy[str]:
+    return st.builds(operator.add, st.sampled_from(prefixes), rest)
+
+
+@lru_cache(maxsize=None)
+def _digit_part() -> st.SearchStrategy[str]:
+    return _prefixed(DIGITS, _underscored(DIGITS))
+
+
+@lru_cache(maxsize=None)
+def decimal_literals() -> st.SearchStrategy[str]:
+    """Generate decimal integer literals, such as ``0``, ``1_000``, or ``0_0``."""
+    return st.one_of(
+        _prefixed("0", _underscored("0")),
+        _prefixed("123456789", _underscored(DIGITS)),
+    )
+
+
+@lru_cache(maxsize=None)
+def radix_literals(base: int) -> st.SearchStrategy[str]:
+    """Generate hexadecimal, octal, or binary integer literals, such as ``0x_Ff``."""
+    prefix, digits = RADIXES[base]
+    return st.builds(
+        "0{}{}{}{}".format,
+        st.sampled_from(prefix),
+        st.sampled_from(["", "_"]),
+        st.sampled_from(digits),
+        _underscored(digits),
+    )
+
+
+@lru_cache(maxsize=None)
+def integer_literals() -> st.SearchStrategy[str]:
+    """Generate integer literals in any base, as matched by ``tokenize.Intnumber``."""
+    return st.one_of(decimal_literals(), *map(radix_literals, (16, 2, 8)))
+
+
+@lru_cache(maxsize=None)
+def float_literals() -> st.SearchStrategy[str]:
+    """Generate float literals, such as ``1.``, ``.5e-3``, or ``1_0E1``."""
+    digits = _digit_part()
+    exponent = st.builds(
+        "{}{}{}".format, st.sampled_from("eE"), st.sampled_from(["", "+", "-"]), digits
+    )
+    point_float = st.one_of(
+        st.builds("{}.{}".format, digits, st.just("") | digits),
+        st.builds(operator.add, st.just("."), digits),
+    )
+    return st.one_of(
+        st.builds(operator.add, point_float, st.just("") | exponent),
+        st.builds(operator.add, digits, exponent),
+    )
+
+
+@lru_cache(maxsize=None)
+def imaginary_literals() -> st.SearchStrategy[str]:
+    """Generate imaginary literals, such as ``1j`` or ``1.5J``."""
+    return st.builds(
+        operator.add, st.one_of(_digit_part(), float_literals()), st.sampled_from("jJ")
+    )
+
+
+@lru_cache(maxsize=None)
+def number_literals() -> st.SearchStrategy[str]:
+    """Generate numeric literals of any kind, as matched by ``tokenize.Number``.
+
+    These are built by construction from their parts, which is several times
+    cheaper to draw than ``st.from_regex()`` of the equivalent pattern, and they
+    shrink towards ``0``.
+    """
+    return st.one_of(integer_literals(), float_literals(), imaginary_literals())
+
+
+class Token(NamedTuple):
+    """A token, as the ``type`` and ``string`` reported by ``tokenize``."""
+
+    type: int
+    string: str
+
+
+BRACKETS = {"(": ")", "[": "]", "{": "}"}
+# `!` is only an operator inside f-strings, which we don't generate.
+OPERATORS = sorted(
+    op
+    for op in EXACT_TOKEN_TYPES
+    if op not in BRACKETS and op not in BRACKETS.values() and op != "!"
+)
+# Brackets and separators never merge with a neighbouring token, so e.g. `f(x,y)`
+# is four tokens - but `x` and `y` must be separated by whitespace, or they would be
+# a single name.  Continuation lines are whitespace too, as far as tokens go.
+UNSPACED = frozenset(BRACKETS).union(BRACKETS.values(), ",;")
+SPACES = ("", " ", "\t")
+SEPARATORS = SPACES + (" \\\n",)
+TOKEN_KINDS = ("name", "number", "string", "operator", "open")
+LINE_KINDS = ("logical", "blank", "comment")
+# The most tokens we draw for each logical line, before closing any brackets.
+MAX_LINE_TOKENS = 8
+# Comments and long strings can't contain line breaks, and we avoid any control
+# characters which might be read as one.
+TEXT_CHARS = st.characters(codec="utf-8", exclude_categories=("Cc", "Cs", "Zl", "Zp"))
+
+
+@lru_cache(maxsize=None)
+def token_strategies() -> Dict[str, st.SearchStrategy[str]]:
+    """Return strategies for the string of each kind of token."""
+    strings = st.one_of(
+        st.builds(
+            operator.add,
+            st.sampled_from(["", "r", "u"]),
+            st.text(st.characters(codec="utf-8", min_codepoint=1)).map(repr),
+        ),
+        st.binary().map(repr),
+        st.builds(
+            '{}"""{}"""'.format,
+            st.sampled_from(["", "r"]),
+            st.text(
+                st.characters(
+                    codec="utf-8",
+                    exclude_categories=("Cc", "Cs", "Zl", "Zp"),
+                    exclude_characters='"\\',
+                    include_characters="\n",
+                )
+            ),
+        ),
+    )
+    return {
+        "name": st.one_of(
+            _identifiers(KEYWORDS, word_chars_only=TOKENIZE_WORDS_ONLY),
+            st.sampled_from(sorted(KEYWORDS)),
+        ),
+        "number": number_literals(),
+        "string": strings,
+        "operator": st.sampled_from(OPERATORS),
+        "comment": st.builds(operator.add, st.just("#"), st.text(TEXT_CHARS)),
+    }
+
+
+@st.composite
+def token_streams(draw, max_lines: int) -> Tuple[List[Token], str]:  # type: ignore
+    strategies = token_strategies()
+    tokens: List[Token] = []
+    source: List[str] = []
+    indents = [0]
+    started = False
+
+    def add(type_: int, string: str, separator: str = "") -> None:
+        tokens.append(Token(type_, string))
+        source.append(separator + string)
+
+    for _ in range(draw(st.integers(0, max_lines))):
+        kind = draw(st.sampled_from(LINE_KINDS))
+        if kind == "blank":
+            add(NL, "\n")
+            continue
+        if kind == "comment":
+            source.append(" " * indents[-1])
+            add(COMMENT, draw(strategies["comment"]))
+            add(NL, "\n")
+            continue
+
+        # As for lark's Indenter, each logical line after the first either returns
+        # to the indentation of an enclosing block, or starts a new indented block.
+        level = draw(st.integers(0, len(indents) if started else 0))
+        if level == len(indents):
+            indents.append(indents[-1] + draw(st.integers(1, 4)))
+            tokens.append(Token(INDENT, " " * indents[-1]))
+        while len(indents) > level + 1:
+            indents.pop()
+            tokens.append(Token(DEDENT, ""))
+        source.append(" " * indents[-1])
+        started = True
+
+        # Inside brackets, the line can continue over several physical lines, and
+        # each line break is an NL token rather than ending the statement.
+        brackets: List[str] = []
+        previous = ""
+        for i in range(draw(st.integers(1, MAX_LINE_TOKENS))):
+            kinds = TOKEN_KINDS + ("close", "newline") if brackets else TOKEN_KINDS
+            kind = draw(st.sampled_from(kinds))
+            if kind == "newline":
+                if draw(st.booleans()):
+                    add(
+                        COMMENT,
+                        draw(strategies["comment"]),
+                        draw(st.sampled_from(SPACES)),
+                    )
+                add(NL, "\n")
+                previous = "\n"
+                continue
+            if kind == "open":
+                string = draw(st.sampled_from(sorted(BRACKETS)))
+                brackets.append(BRACKETS[string])
+            elif kind == "close":
+                string = brackets.pop()
+            else:
+                string = draw(strategies[kind])
+            if i == 0 or previous == "\n":
+                separator = draw(st.sampled_from(SPACES)) if i else ""
+            elif previous in UNSPACED or string in UNSPACED:
+                separator = draw(st.sampled_from(SEPARATORS))
+            else:
+                separator = draw(st.sampled_from(SEPARATORS[1:]))
+            add(
+                (
+                    NAME
+                    if kind == "name"
+                    else {"number": NUMBER, "string": STRING}.get(kind, OP)
+                ),
+                string,
+                separator,
+            )
+            previous = string
+        while brackets:
+            add(OP, brackets.pop(), draw(st.sampled_from(SEPARATORS)))
+        if draw(st.booleans()):
+            add(COMMENT, draw(strategies["comment"]), draw(st.sampled_from(SPACES)))
+        add(NEWLINE, "\n")
+
+    tokens.extend(Token(DEDENT, "") for _ in indents[1:])
+    tokens.append(Token(ENDMARKER, ""))
+    return tokens, "".join(source)
+
+
+def from_tokens(*, max_lines: int = 10) -> st.SearchStrategy[Tuple[List[Token], str]]:
+    r"""Generate ``(tokens, source)`` pairs, where tokenizing source gives tokens.
+
+    Tokens are drawn directly rather than from the grammar, so the source code is
+    not usually valid Python - but it is much faster to generate, and we know what
+    a tokenizer should make of it: brackets are balanced, and each ``INDENT`` and
+    ``DEDENT`` enters or returns to a block.  Each token is the ``type`` and
+    ``string`` of a ``tokenize.TokenInfo``, ending with ``ENDMARKER``, and the
+    source has up to ``max_lines`` lines.  Before Python 3.12, ``tokenize`` only
+    recognises names made of ``\w`` characters, so on those versions we only
+    generate such names.
+    """
+    assert isinstance(max_lines, int) and max_lines >= 0, max_lines
+    return token_streams(max_lines)
@@ -0,0 +1,52 @@
+"""Cheap measurements of generated code, used as targets for ``hypothesis.target()``.
+
+Both of our strategies compile each example anyway, to check that it's valid, so we
+compile via an AST and reuse both results here instead of parsing again.  We also
+count without materialising lists of nodes or ``dis.Instruction`` objects.
+"""
+
+import ast
+import dis
+from collections import Counter
+from types import CodeType
+from typing import List, NamedTuple, Tuple
+
+# CPython 3.11+ has inline cache entries in the bytecode, which `dis` hides.
+CACHE_OPCODE = dis.opmap.get("CACHE")
+
+
+class Metrics(NamedTuple):
+    instructions: int
+    nodes: int
+    unique_nodes: int
+
+    def targets(self, prefix: str) -> List[Tuple[float, str]]:
+        """Return a list of (score, label) pairs, to pass to ``target()``."""
+        return [
+            (float(self.instructions), f"({prefix}) instructions in bytecode"),
+            (float(self.nodes), f"({prefix}) total number of ast nodes"),
+            (float(self.unique_nodes), f"({prefix}) number of unique ast node types"),
+        ]
+
+
+def compile_with_tree(source: str, mode: str) -> Tuple[ast.AST, CodeType]:
+    """Compile source to both an AST and a code object, parsing it only once."""
+    tree = compile(source, "<string>", mode, ast.PyCF_ONLY_AST)
+    return tree, compile(tree, "<string>", mode)
+
+
+def count_instructions(code: CodeType) -> int:
+    """Count the instructions in code, as listed by ``dis.Bytecode(code)``."""
+    opcodes = code.co_code[::2]
+    if CACHE_OPCODE is None:  # pragma: no cover  # before Python 3.11
+        return len(opcodes)
+    return len(opcodes) - opcodes.count(CACHE_OPCODE)
+
+
+def measure(tree: ast.AST, code: CodeType) -> Metrics:
+    node_types = Counter(map(type, ast.walk(tree)))
+    return Metrics(
+        instructions=count_instructions(code),
+        nodes=sum(node_types.values()),
+        unique_nodes=len(node_types),
+    )
@@ -0,0 +1,263 @@
+"""Generating Python source code by mutating existing programs.
+
+Building programs from scratch - from the grammar or from LibCST nodes - rarely
+reaches anything as large or as realistic as code that people actually write.
+Instead, we can start from real source code: parse it with LibCST, then replace,
+splice, swap, or duplicate a few subtrees.  Replacements are drawn from the same
+strategies as ``from_node()``, and only ever of a type which LibCST allows in that
+position, so most mutants are still valid - and every example shrinks towards an
+unmodified seed program.
+"""
+
+import collections.abc
+import dataclasses
+from functools import lru_cache, partial
+from inspect import isabstract
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+import libcst
+from hypothesis import strategies as st
+
+from .cst import compilable, record_targets, register_strategies
+
+# The kinds of node we mutate.  Other nodes, such as whitespace or operators, are
+# mutated only as part of an enclosing expression or statement.
+MUTABLE = (libcst.BaseExpression, libcst.BaseStatement, libcst.BaseSmallStatement)
+MUTATIONS = ("replace", "splice", "swap", "duplicate")
+
+
+# The steps from a module to one of its descendants: the name of each field, and
+# the index if that field is a sequence.
+Path = Tuple[Tuple[str, Optional[int]], ...]
+
+
+class Site(NamedTuple):
+    """A node which we could mutate, and the node types allowed in its place."""
+
+    node: libcst.CSTNode
+    path: Path
+    allowed: Tuple[Type[libcst.CSTNode], ...]
+    in_sequence: bool
+    # Sites are listed in pre-order, so those nested inside this one are exactly
+    # the sites after it and before `end`.
+    end: int
+
+
+# Every concrete node type, to look up the subtypes of abstract types.
+NODE_TYPES = [
+    t
+    for t in vars(libcst).values()
+    if isinstance(t, type) and issubclass(t, libcst.CSTNode) and not isabstract(t)
+]
+
+
+@lru_cache(maxsize=None)
+def _fields(
+    t: Type[libcst.CSTNode],
+) -> Dict[str, Tuple[Tuple[Type[libcst.CSTNode], ...], bool]]:
+    """Return the node types allowed in each field of t which holds child nodes.
+
+    For each field we also return whether it holds a sequence of those nodes.
+    """
+    hints = get_type_hints(t)
+    result = {}
+    for field in dataclasses.fields(t):
+        hint = hints[field.name]
+        in_sequence = get_origin(hint) is collections.abc.Sequence
+        if in_sequence:
+            hint = get_args(hint)[0]
+        options = get_args(hint) if get_origin(hint) is Union else (hint,)
+        types = tuple(
+            o for o in options if isinstance(o, type) and issubclass(o, libcst.CSTNode)
+        )
+        if types:
+            result[field.name] = (types, in_sequence)
+    return result
+
+
+@lru_cache(maxsize=None)
+def _containers() -> FrozenSet[Type[libcst.CSTNode]]:
+    """Return the concrete node types which are, or can contain, mutable nodes."""
+    found = {t for t in NODE_TYPES if issubclass(t, MUTABLE)}
+    while True:
+        new = {
+            t
+            for t in NODE_TYPES
+            if t not in found
+            and any(
+                issubclass(c, types) for c in found for types, _ in _fields(t).values()
+            )
+        }
+        if not new:
+            return frozenset(found)
+        found |= new
+
+
+@lru_cache(maxsize=None)
+def _child_fields(
+    t: Type[libcst.CSTNode],
+) -> Dict[str, Tuple[Tuple[Type[libcst.CSTNode], ...], bool]]:
+    # Most nodes in a module are whitespace or punctuation, so we skip any field
+    # which can't contain a mutable node - more than halving the time to find them.
+    return {
+        name: (types, in_sequence)
+        for name, (types, in_sequence) in _fields(t).items()
+        if any(issubclass(c, types) for c in _containers())
+    }
+
+
+def mutation_sites(module: libcst.Module) -> List[Site]:
+    """Return every expression and statement in module, in pre-order."""
+    sites: List[Site] = []
+
+    def visit(node: libcst.CSTNode, path: Path) -> None:
+        for name, (allowed, in_sequence) in _child_fields(type(node)).items():
+            value = getattr(node, name)
+            children = enumerate(value) if in_sequence else [(None, value)]
+            for i, child in children:
+                if not isinstance(child, libcst.CSTNode):
+                    continue
+                index = len(sites)
+                child_path = path + ((name, i),)
+                if isinstance(child, MUTABLE):
+                    sites.append(Site(child, child_path, allowed, in_sequence, index))
+                visit(child, child_path)
+                if isinstance(child, MUTABLE):
+                    sites[index] = sites[index]._replace(end=len(sites))
+
+    visit(module, ())
+    return sites
+
+
+def replace_at(
+    module: libcst.Module, path: Path, new: Sequence[libcst.CSTNode]
+) -> libcst.Module:
+    """Return a copy of module with the node at path replaced by the new nodes.
+
+    We only rebuild the nodes enclosing the replaced node, which is much faster
+    than transforming the whole module, and nodes are immutable so there's no need
+    to copy anything else.  Each rebuilt node is validated by LibCST.
+    """
+    parents = [module]
+    for name, i in path[:-1]:
+        value = getattr(parents[-1], name)
+        parents.append(value if i is None else value[i])
+    for parent, (name, i) in zip(reversed(parents), reversed(path)):
+        if i is None:
+            (value,) = new
+        else:
+            value = list(getattr(parent, name))
+            end = i + 1
+            value[i:end] = new
+        new = [parent.with_changes(**{name: value})]
+    return new[0]
+
+
+@st.composite
+def mutants(
+    draw,  # type: ignore
+    seeds: Sequence[Tuple[libcst.Module, List[Site]]],
+    donors: Sequence[libcst.CSTNode],
+    max_mutations: int,
+) -> str:
+    # We find the sites of each seed module in advance, and only search the module
+    # again after it has been mutated.
+    sites: Optional[List[Site]]
+    module, sites = draw(st.sampled_from(seeds))
+    for _ in range(draw(st.integers(0, max_mutations))):
+        if sites is None:
+            sites = mutation_sites(module)
+        if not sites:
+            break
+        previous = module
+        index = draw(st.integers(0, len(sites) - 1))
+        site = sites[index]
+        kind = draw(st.sampled_from(MUTATIONS))
+        try:
+            if kind == "swap":
+                # Swap with another node which fits in each other's place, and which
+                # neither contains nor is contained by this one - so replacing one
+                # doesn't change the path to the other.
+                others = [
+                    other
+                    for i, other in enumerate(sites)
+                    if not (index <= i < site.end or i <= index < other.end)
+                    and isinstance(other.node, site.allowed)
+                    and isinstance(site.node, other.allowed)
+                ]
+                if others:
+                    other = draw(st.sampled_from(others))
+                    module = replace_at(module, site.path, [other.node])
+                    module = replace_at(module, other.path, [site.node])
+            elif kind == "duplicate":
+                if site.in_sequence and not isinstance(
+                    site.node, libcst.BaseExpression
+                ):
+                    module = replace_at(module, site.path, [site.node, site.node])
+            elif kind == "splice":
+                # Copy in a subtree from any of the seed programs.
+                fits = [node for node in donors if isinstance(node, site.allowed)]
+                if fits:
+                    module = replace_at(
+                        module, site.path, [draw(st.sampled_from(fits))]
+                    )
+            else:
+                # Usually draw a node of the same type, which is most likely to be
+                # valid here, but sometimes any type that LibCST allows in its place.
+                if draw(st.integers(0, 3)):
+                    strategy = st.from_type(type(site.node))
+                else:
+                    strategy = st.one_of(*map(st.from_type, site.allowed))
+                module = replace_at(module, site.path, [draw(strategy)])
+        except libcst.CSTValidationError:
+            # e.g. the new node needs whitespace which its parent doesn't have, so we
+            # skip this mutation rather than discarding the whole example.
+            continue
+        if module is not previous:
+            sites = None
+    return module.code
+
+
+def from_mutations(
+    seed_sources: Iterable[str],
+    *,
+    max_mutations: int = 3,
+    auto_target: bool = True,
+) -> st.SearchStrategy[str]:
+    """Generate syntactically-valid Python source code by mutating seed programs.
+
+    Each example is one of ``seed_sources`` with up to ``max_mutations`` changes:
+    replacing an expression or statement with a node drawn as for ``from_node()``,
+    replacing it with a copy of a subtree from any seed, swapping two subtrees, or
+    duplicating a statement.  Starting from real code reaches large and realistic
+    programs far faster than generating from scratch, and examples shrink towards
+    the unmodified seeds.  Mutants which don't compile are rejected.
+    """
+    modules = [libcst.parse_module(source) for source in seed_sources]
+    assert modules, "from_mutations() needs at least one seed program"
+    assert isinstance(max_mutations, int) and max_mutations >= 0, max_mutations
+    register_strategies()
+    seeds = [(module, mutation_sites(module)) for module in modules]
+    donors = [site.node for _, sites in seeds for site in sites]
+    code = mutants(seeds, donors, max_mutations)
+    if auto_target:
+        check = partial(
+            record_targets, node="from_mutations", prefix="hypothesmith from_mutations"
+        )
+    else:
+        check = partial(compilable, node="from_mutations")
+    return code.filter(check)
@@ -0,0 +1,101 @@
+"""Pruning Lark's Python grammar to what a particular version of CPython accepts.
+
+``python.lark`` is Lark's generic grammar for Python 3, which accepts a good deal
+of code that CPython rejects - some only on older versions, such as ``match``
+statements before Python 3.10, and some on every version, such as ``del 1`` or
+``lambda: x := 1``.  We generate from the grammar and then filter out anything
+which doesn't compile, so every such production wastes a draw.  Instead, we edit
+the grammar text before building it, to remove or constrain those productions.
+
+Each edit replaces some text of the grammar, and checks that it was there to
+replace - so if ``python.lark`` is updated, any edit which no longer applies will
+fail loudly rather than silently doing nothing.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+Version = Tuple[int, int]
+
+# The oldest target grammar version; we can generate code for it on any newer Python.
+OLDEST_VERSION = (3, 8)
+
+
+class Edit(NamedTuple):
+    """Replace ``old`` with ``new``, for versions before ``before`` if given."""
+
+    old: str
+    new: str
+    before: Optional[Version] = None
+
+
+EDITS = (
+    # CPython treats a lone carriage return as a line break, so it can't appear in
+    # comments, and nor can whitespace between a line continuation and newline.
+    Edit("COMMENT: /#[^\\n]*/", "COMMENT: /#[^\\r\\n]*/"),
+    Edit("%ignore /\\\\[\\t \\f]*\\r?\\n/", "%ignore /\\\\\\r?\\n/"),
+    # Assignment expressions are only valid unparenthesized in a few places, and
+    # never e.g. as a statement or in a lambda body, so we always parenthesize.
+    Edit("     | lambdef\n     | assign_expr\n", "     | lambdef\n"),
+    Edit('     | "(" test ")"\n', '     | "(" test ")"\n     | "(" assign_expr ")"\n'),
+    # Iterable unpacking can't be used in a comprehension.
+    Edit('"(" comprehension{test_or_star_expr} ")"', '"(" comprehension{test} ")"'),
+    Edit('"[" comprehension{test_or_star_expr} "]"', '"[" comprehension{test} "]"'),
+    # The targets of `del` and `for` statements and comprehensions must be names,
+    # attributes, subscripts, or tuples or lists of targets - not e.g. calls - as
+    # must assignment targets.  Targets of assignments and `for` loops, but not of
+    # `del`, may also be starred in a tuple.  Annotated and augmented assignments
+    # must have a single target.
+    Edit(
+        "?exprlist: (expr|star_expr)\n"
+        '         | (expr|star_expr) (("," (expr|star_expr))+ [","]|",")\n',
+        '?exprlist: target | target (("," target)+ [","]|",")\n'
+        '?target: single_target | "(" exprlist ")" | "[" [exprlist] "]" -> list\n'
+        "?single_target: name -> var\n"
+        '              | atom_expr "." name -> getattr\n'
+        '              | atom_expr "[" subscriptlist "]" -> getitem\n',
+    ),
+    Edit(
+        'assign: testlist_star_expr ("=" (yield_expr|testlist_star_expr))+',
+        'assign: (star_targets "=")+ (yield_expr|testlist_star_expr)\n'
+        '?star_targets: target | star_target (("," star_target)+ [","]|",")\n'
+        '?star_target: target | "*" target -> star_expr',
+    ),
+    Edit('for_stmt: "for" exprlist', 'for_stmt: "for" star_targets'),
+    Edit('comp_for: [ASYNC] "for" exprlist', 'comp_for: [ASYNC] "for" star_targets'),
+    Edit(
+        'annassign: testlist_star_expr ":" test',
+        'annassign: single_target ":" test',
+    ),
+    Edit(
+        "augassign: testlist_star_expr augassign_op",
+        "augassign: single_target augassign_op",
+    ),
+    # Keyword arguments must be names, as in `f(x=1)`, not e.g. `f(x.y=1)`.
+    Edit('?argvalue: test ("=" test)?', '?argvalue: test | name "=" test'),
+    # A bare `*` in a signature must be followed by a named parameter.
+    Edit(
+        "starparams: (starparam | starguard) poststarparams",
+        'starparams: starparam poststarparams | starguard ("," paramvalue)+ '
+        '["," kwparams]',
+    ),
+    Edit(
+        'lambda_starparams: "*" [name]  ("," lambda_paramvalue)*',
+        'lambda_starparams: "*" name ("," lambda_paramvalue)*'
+        ' ["," [lambda_kwparams]]\n'
+        '                 | "*" ("," lambda_paramvalue)+',
+    ),
+    # Syntax which is new since Python 3.8, the oldest target grammar version.
+    Edit("| try_stmt | match_stmt\n", "| try_stmt\n", before=(3, 10)),
+)
+
+
+@lru_cache(maxsize=None)
+def prune_grammar(grammar: str, version: Version) -> str:
+    """Return the grammar, edited to avoid code which is invalid on version."""
+    for edit in EDITS:
+        if edit.before is not None and version >= edit.before:
+            continue
+        assert edit.old in grammar, f"can't find {edit.old!r} to edit in grammar"
+        grammar = grammar.replace(edit.old, edit.new, 1)
+    return grammar
@@ -0,0 +1,149 @@
+"""Reducing failing programs by editing their structure.
+
+When a test fails on a large generated program, Hypothesis shrinks the choices
+which generated it - and every candidate means drawing and compiling a whole new
+program, most of which are rejected or pass.  Editing the failing program itself
+is far more direct: we parse it with LibCST, then repeatedly try deleting a
+statement, replacing a statement or expression with a minimal one such as ``pass``
+or ``x``, or hoisting a child node into its parent's place.  Each candidate must
+be shorter, still compile, and still fail, so every step makes progress::
+
+    from hypothesmith.reduction import reduce_failure
+
+    smaller = reduce_failure(test_my_tool.hypothesis.inner_test, source)
+
+You can then add ``@example(smaller)`` to your test, and e.g. run Hypothesis with
+``phases=[Phase.explicit, Phase.reuse, Phase.generate, Phase.target]`` to skip
+its own shrinking entirely.
+"""
+
+import traceback
+from typing import Callable, Iterator, List, Optional, Set, Tuple
+
+import libcst
+
+from .cst import compilable
+from .mutation import Site, mutation_sites, replace_at
+
+# The smallest node we try in place of each kind of node.
+MINIMAL_NODES: Tuple[libcst.CSTNode, ...] = (
+    libcst.SimpleStatementLine([libcst.Pass()]),
+    libcst.Pass(),
+    libcst.Name("x"),
+)
+
+
+def _wrapped(node: libcst.CSTNode, site: Site) -> Optional[libcst.CSTNode]:
+    # An expression can take the place of a statement as an expression statement,
+    # and a small statement can take the place of a statement on its own line.
+    if isinstance(node, libcst.BaseExpression):
+        node = libcst.Expr(node)
+    for wrapper in (node, libcst.SimpleStatementLine([node])):
+        if isinstance(wrapper, site.allowed):
+            return wrapper
+    return None
+
+
+def _edits(sites: List[Site], index: int) -> Iterator[List[libcst.CSTNode]]:
+    """Yield the replacements to try for the node at sites[index], smallest first."""
+    site = sites[index]
+    if site.in_sequence and not isinstance(site.node, libcst.BaseExpression):
+        yield []
+    for node in MINIMAL_NODES:
+        if isinstance(node, site.allowed):
+            yield [node]
+    # Blank lines and comments before a statement.
+    if getattr(site.node, "leading_lines", None):
+        yield [site.node.with_changes(leading_lines=[])]
+    # Hoisting a descendant into this node's place, e.g. replacing `if x: y` with
+    # `y`, or `f(a + b)` with `a + b`.
+    start, end = index + 1, site.end
+    for nested in sites[start:end]:
+        if isinstance(nested.node, site.allowed):
+            yield [nested.node]
+        elif not isinstance(nested.node, libcst.BaseCompoundStatement):
+            wrapped = _wrapped(nested.node, site)
+            if wrapped is not None:
+                yield [wrapped]
+
+
+def reduce_source(
+    source: str,
+    is_interesting: Callable[[str], bool],
+    *,
+    mode: str = "exec",
+) -> str:
+    """Return the smallest variant of source we can find which is interesting.
+
+    ``is_interesting`` is called with candidate programs which compile in the given
+    ``mode``, and should return True if e.g. the candidate still triggers the same
+    bug as the original.  If LibCST can't parse ``source``, we return it unchanged.
+    """
+    assert mode in ("exec", "eval", "single"), mode
+    # We parse expressions as a module too, so that the expression statement can be
+    # replaced by any expression within it.
+    try:
+        tree = libcst.parse_module(source)
+    except libcst.ParserSyntaxError:
+        return source
+    code = tree.code
+    seen: Set[str] = {code}
+    progress = True
+    # Each edit only removes code, but e.g. deleting a statement may make deleting
+    # an earlier one possible - so we keep going until a pass makes no progress.
+    while progress:
+        progress = False
+        index = 0
+        sites = mutation_sites(tree)
+        while index < len(sites):
+            for replacement in _edits(sites, index):
+                try:
+                    candidate = replace_at(tree, sites[index].path, replacement)
+                except libcst.CSTValidationError:
+                    continue
+                new_code = candidate.code
+                if len(new_code) >= len(code) or new_code in seen:
+                    continue
+                seen.add(new_code)
+                if compilable(new_code, mode, node="reduction") and is_interesting(
+                    new_code
+                ):
+                    tree, code, progress = candidate, new_code, True
+                    sites = mutation_sites(tree)
+                    break
+            else:
+                index += 1
+    return code
+
+
+def _origin(err: BaseException) -> Tuple[type, str, Optional[int]]:
+    # As for Hypothesis, we treat errors of the same type raised from the same line
+    # as the same bug.
+    frame = traceback.extract_tb(err.__traceback__)[-1]
+    return type(err), frame.filename, frame.lineno
+
+
+def reduce_failure(
+    test: Callable[[str], object], source: str, *, mode: str = "exec"
+) -> str:
+    """Return a smaller program on which ``test`` fails in the same way.
+
+    ``test`` is called with a single argument, the source code, so for a test
+    decorated with ``@given`` pass ``test.hypothesis.inner_test``.  Candidates must
+    raise the same type of exception from the same line as ``test(source)``.
+    """
+    try:
+        test(source)
+    except Exception as err:
+        origin = _origin(err)
+    else:
+        raise ValueError(f"test={test!r} did not fail on source={source!r}")
+
+    def fails_the_same_way(candidate: str) -> bool:
+        try:
+            test(candidate)
+        except Exception as err:
+            return _origin(err) == origin
+        return False
+
+    return reduce_source(source, fails_the_same_way, mode=mode)
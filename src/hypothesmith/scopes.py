@@ -0,0 +1,73 @@
+"""Tracking which statements and expressions are valid in each part of a program.
+
+Some code is grammatical anywhere, but only compiles in the right context: e.g.
+``return`` outside a function, ``break`` outside a loop, or ``await`` outside an
+async function are rejected by CPython's compiler.  While generating, we keep track
+of the scope we're in - the set of such features which are valid there - and only
+choose productions which are valid in it, rather than rejecting the whole program
+afterwards.
+"""
+
+from functools import lru_cache
+from typing import FrozenSet, Optional, Set
+
+Scope = FrozenSet[str]
+
+AWAIT = "await"  # also `async for` and `async with`
+LOOP = "loop"  # `break` and `continue`
+NONLOCAL = "nonlocal"
+RETURN = "return"
+YIELD = "yield"
+YIELD_FROM = "yield from"
+
+MODULE: Scope = frozenset()
+
+
+def allows(scope: Scope, feature: Optional[str]) -> bool:
+    return feature is None or feature in scope
+
+
+def _enclosed(outer: Scope) -> bool:
+    # `nonlocal` needs an enclosing function, perhaps with a class in between.
+    return RETURN in outer or NONLOCAL in outer
+
+
+@lru_cache(maxsize=None)
+def function_body(outer: Scope, is_async: bool = False) -> Scope:
+    """Return the scope in the body of a function defined in ``outer``."""
+    scope = {RETURN, YIELD, AWAIT if is_async else YIELD_FROM}
+    if _enclosed(outer):
+        scope.add(NONLOCAL)
+    return frozenset(scope)
+
+
+@lru_cache(maxsize=None)
+def lambda_body(outer: Scope) -> Scope:
+    # Lambdas can't be async, and contain no statements - so no loops either.
+    return frozenset({YIELD, YIELD_FROM})
+
+
+@lru_cache(maxsize=None)
+def class_body(outer: Scope) -> Scope:
+    return frozenset({NONLOCAL}) if _enclosed(outer) else MODULE
+
+
+@lru_cache(maxsize=None)
+def loop_body(outer: Scope) -> Scope:
+    return outer | {LOOP}
+
+
+@lru_cache(maxsize=None)
+def comprehension(outer: Scope) -> Scope:
+    return outer - {YIELD, YIELD_FROM}
+
+
+def fresh_name(name: str, taken: Set[str]) -> str:
+    """Return ``name``, with underscores appended until it's not in ``taken``.
+
+    We use this to avoid e.g. duplicate parameter names, which are a SyntaxError.
+    """
+    while name in taken:
+        name += "_"
+    taken.add(name)
+    return name
@@ -0,0 +1,81 @@
+"""Opt-in statistics about how much work our strategies do, and how much is wasted.
+
+Code generated from the grammar can be rejected by the parser, and LibCST nodes can
+fail validation, so some of each test budget is spent on draws which are thrown
+away.  To see where, collect statistics while running your tests::
+
+    from hypothesmith.stats import collect_statistics
+
+    with collect_statistics() as stats:
+        test_something()
+    print(stats.to_json(indent=2))
+
+We count draws attempted and rejections by cause for each grammar rule or LibCST
+node type, the time spent compiling, and the bytes of Hypothesis' choice sequence
+consumed.  Counts for a rule or node type include everything nested inside it.
+"""
+
+import json
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+Key = Tuple[str, str]
+
+_collector: Optional["Statistics"] = None
+
+
+class Statistics:
+    def __init__(self) -> None:
+        self.draws: "Counter[Key]" = Counter()
+        self.rejections: "Counter[Tuple[str, str, str]]" = Counter()
+        self.compile_seconds: "Counter[Key]" = Counter()
+        self.choice_bytes: "Counter[Key]" = Counter()
+
+    def record_draw(self, section: str, name: str, choice_bytes: int) -> None:
+        self.draws[section, name] += 1
+        self.choice_bytes[section, name] += choice_bytes
+
+    def record_rejection(self, section: str, name: str, cause: str) -> None:
+        self.rejections[section, name, cause] += 1
+
+    def record_compile(self, section: str, name: str, seconds: float) -> None:
+        self.compile_seconds[section, name] += seconds
+
+    def as_dict(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Return nested dicts of section -> rule or node type -> statistics."""
+        keys = set(self.draws) | set(self.compile_seconds)
+        keys.update((section, name) for section, name, _ in self.rejections)
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for section, name in sorted(keys):
+            result.setdefault(section, {})[name] = {
+                "draws": self.draws[section, name],
+                "rejections": {
+                    cause: count
+                    for (s, n, cause), count in sorted(self.rejections.items())
+                    if (s, n) == (section, name)
+                },
+                "compile_seconds": self.compile_seconds[section, name],
+                "choice_bytes": self.choice_bytes[section, name],
+            }
+        return result
+
+    def to_json(self, **kwargs: Any) -> str:
+        """Return statistics as a JSON string; kwargs are passed to ``json.dumps``."""
+        return json.dumps(self.as_dict(), **kwargs)
+
+
+def current() -> Optional[Statistics]:
+    """Return the active statistics collector, or None if we're not collecting."""
+    return _collector
+
+
+@contextmanager
+def collect_statistics() -> Iterator[Statistics]:
+    """Collect statistics about draws from our strategies within this context."""
+    global _collector
+    previous, _collector = _collector, Statistics()
+    try:
+        yield _collector
+    finally:
+        _collector = previous
@@ -0,0 +1,169 @@
+"""Stream programs from the grammar, without running a Hypothesis test.
+
+``@given`` and ``.example()`` run the whole Hypothesis engine for each batch of
+examples: tracking which choices have been tried, targeting, shrinking, and so on.
+That's ideal for tests, but when we just want to pipe millions of programs into
+some other tool it's overhead we don't need.  Instead we draw each program directly
+from a ConjectureData object with random choices, and skip duplicates with a set of
+SHA-256 digests - rather than Hypothesis' tree of every choice made, which would keep
+growing.
+"""
+
+import time
+import warnings
+from random import Random
+from typing import Iterator, Optional, Set
+
+from hypothesis.control import BuildContext
+from hypothesis.errors import StopTest, UnsatisfiedAssumption
+from hypothesis.internal.conjecture.data import ConjectureData
+
+from .corpus import source_digest
+from .pruning import Version
+from .syntactic import (
+    COMPILE_MODES,
+    VALIDATION_POLICIES,
+    GrammarStrategy,
+    _check_target_version,
+    _get_strategy,
+)
+
+
+class SourceStream(Iterator[str]):
+    """An endless iterator of programs, with counters to report throughput.
+
+    Programs are only generated when you ask for the next one, so a slow consumer
+    simply slows down generation - and ``seconds`` counts only the time spent
+    generating, not waiting for the consumer.  If ``max_failures`` attempts in a
+    row are rejected or duplicates, we've probably run out of programs and stop.
+    """
+
+    def __init__(
+        self,
+        strategy: GrammarStrategy,
+        seed: int,
+        unique: bool,
+        max_failures: int = 1000,
+    ) -> None:
+        self.strategy = strategy
+        self.seed = seed
+        self.random = Random(seed)  # noqa: S311
+        self.seen: Optional[Set[str]] = set() if unique else None
+        self.max_failures = max_failures
+        self.failures = 0
+        self.generated = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def __next__(self) -> str:
+        start = time.perf_counter()
+        try:
+            while self.failures < self.max_failures:
+                source = self.draw()
+                self.failures += 1
+                if source is None:
+                    self.rejected += 1
+                    continue
+                if self.seen is not None:
+                    digest = source_digest(source)
+                    if digest in self.seen:
+                        self.duplicates += 1
+                        continue
+                    self.seen.add(digest)
+                self.failures = 0
+                self.generated += 1
+                self.bytes += len(source.encode("utf-8", "surrogatepass"))
+                return source
+            raise StopIteration
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def draw(self) -> Optional[str]:
+        """Return a program, or None if the attempt was rejected or overran."""
+        data = ConjectureData(random=self.random)
+        # Many valid programs get a SyntaxWarning when we compile them, e.g. for
+        # `1 is 1`, and we don't want to print thousands of those to stderr.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", SyntaxWarning)
+            try:
+                with BuildContext(data, wrapped_test=SourceStream):
+                    return data.draw(self.strategy)
+            except (StopTest, UnsatisfiedAssumption):
+                return None
+            finally:
+                data.freeze()
+
+    @property
+    def attempts(self) -> int:
+        return self.generated + self.rejected + self.duplicates
+
+    def throughput(self) -> str:
+        """Return a one-line summary of the counters, e.g. for logging."""
+        seconds = self.seconds or float("nan")
+        return (
+            f"{self.generated} programs ({self.bytes} bytes) in {self.seconds:.1f}s: "
+            f"{self.generated / seconds:.1f} programs/sec, "
+            f"{self.bytes / seconds:.0f} bytes/sec, "
+            f"{self.rejected} rejected, {self.duplicates} duplicates"
+        )
+
+
+def stream(
+    start: str = "file_input",
+    *,
+    seed: Optional[int] = None,
+    unique: bool = True,
+    validate: str = "statement",
+    max_depth: Optional[int] = None,
+    max_statements: Optional[int] = None,
+    max_source_bytes: Optional[int] = None,
+    target_version: Optional[Version] = None,
+    max_failures: int = 1000,
+) -> SourceStream:
+    """Return an endless iterator of syntactically-valid programs from the grammar.
+
+    This uses the same strategy as ``from_grammar()``, but draws each program
+    directly rather than running a Hypothesis test - so there is no targeting or
+    shrinking, but it generates around a third more programs per second and never
+    pauses between batches, for generating a corpus or differential testing at
+    scale.  For example::
+
+        for source in itertools.islice(hypothesmith.stream(seed=0), 10**6):
+            check_my_parser(source)
+
+    The same ``seed`` always produces the same programs; if it's None we choose
+    a seed at random and store it as the ``seed`` attribute.  With ``unique=True``,
+    we skip any program we've already generated.  The iterator also counts the
+    programs ``generated``, ``rejected``, and ``duplicates`` skipped, and the
+    ``bytes`` and ``seconds`` spent generating them - see ``throughput()``.
+
+    If ``max_failures`` attempts in a row are rejected or duplicates - e.g. because
+    a tiny ``max_source_bytes`` only allows a few distinct programs - the iterator
+    stops, rather than searching forever for a program which may not exist.
+
+    ``start``, ``validate``, the ``max_*`` budgets, and ``target_version`` are as
+    for ``from_grammar()``.
+    """
+    assert start in COMPILE_MODES
+    assert seed is None or isinstance(seed, int)
+    assert isinstance(unique, bool)
+    assert validate in VALIDATION_POLICIES
+    for limit in (max_depth, max_statements, max_source_bytes):
+        assert limit is None or (isinstance(limit, int) and limit >= 0), limit
+    assert isinstance(max_failures, int) and max_failures >= 1, max_failures
+    target_version = _check_target_version(target_version)
+    if seed is None:
+        seed = Random().getrandbits(64)  # noqa: S311
+    strategy = _get_strategy(
+        start,
+        False,
+        validate,
+        max_depth,
+        max_statements,
+        max_source_bytes,
+        "source",
+        target_version,
+    )
+    return SourceStream(strategy, seed, unique, max_failures)
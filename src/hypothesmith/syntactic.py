@@ -1,35 +1,95 @@
 """Hypothesis strategies for generating Python source code, somewhat like CSmith."""
 
 import ast
-import dis
 import sys
+from functools import lru_cache
+from importlib.resources import files
+from random import Random
+from time import perf_counter
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple, Union
+from weakref import WeakKeyDictionary
 
 from hypothesis import assume, strategies as st
+from hypothesis.errors import UnsatisfiedAssumption
 from hypothesis.extra.lark import LarkStrategy
+from hypothesis.internal.conjecture.data import MAX_DEPTH
 from lark import Lark
+from lark.grammar import Terminal
 from lark.indenter import Indenter
 
+from . import scopes, stats, validity
+from .completions import STATEMENT_RULES, Completions, completions
+from .coverage import Alternative, GrammarCoverage
+from .generated import OUTPUTS, make_output
+from .lexical import (
+    ALLOWED_CHARS,
+    decimal_literals,
+    float_literals,
+    identifiers,
+    imaginary_literals,
+    radix_literals,
+)
+from .metrics import measure
+from .pruning import OLDEST_VERSION, Version, prune_grammar
+
 # To update this grammar file, run
 # wget https://raw.githubusercontent.com/lark-parser/lark/master/lark/grammars/python.lark -O src/hypothesmith/python.lark
-if sys.version_info < (3, 9):  # pragma: no cover
-    from importlib.resources import read_text
-
-    LARK_GRAMMAR = read_text("hypothesmith", "python.lark")
-else:  # pragma: no cover  # not on py38, anyway
-    from importlib.resources import files
-
-    LARK_GRAMMAR = (
-        files("hypothesmith").joinpath("python.lark").read_text(encoding="utf8")
-    )
+LARK_GRAMMAR = files("hypothesmith").joinpath("python.lark").read_text(encoding="utf8")
 
 COMPILE_MODES = {
     "eval_input": "eval",
     "file_input": "exec",
-    "stmt": "single",
-    "simple_stmt": "single",
-    "compound_stmt": "single",
+    "single_input": "single",
+}
+# With ``validate="statement"``, we parse each simple statement as soon as it's drawn
+# to reject invalid code early.  Compound statements are left to the final compile
+# of the whole program, because checking them too would mean re-parsing nested
+# statements at every level - quadratic in the nesting depth.
+STATEMENT_MODES = {"simple_stmt": "single"}
+VALIDATION_POLICIES = ("statement", "top")
+# Once we've used this fraction of Hypothesis' choice budget, we always choose the
+# expansion of each rule which finishes soonest.  Without this the grammar tends to
+# grow without limit, and most draws were discarded for overrunning the buffer or
+# nesting too deeply - or, worse, finished only to fail to compile; tokens are not
+# always separated by whitespace, so large programs are very rarely valid.
+CLOSING_FRACTION = 0.03
+# Hypothesis discards any draw nested more than MAX_DEPTH spans deep.  Each rule is
+# one span, and drawing a terminal from a regex can take up to about this many more.
+TERMINAL_SPANS = 25
+# Some symbols are only valid in part of a program, e.g. `break` in a loop, and we
+# only choose expansions containing them where they're valid - see scopes.py.
+SCOPED_SYMBOLS = {
+    "AWAIT": scopes.AWAIT,
+    "ASYNC": scopes.AWAIT,  # `async for` and `async with`, but not `async def`
+    "break_stmt": scopes.LOOP,
+    "continue_stmt": scopes.LOOP,
+    "nonlocal_stmt": scopes.NONLOCAL,
+    "return_stmt": scopes.RETURN,
+    "yield_expr": scopes.YIELD,
+    "yield_stmt": scopes.YIELD,
+}
+# For rules with a body in a new scope, the symbol of the body and its scope.  Only
+# the first such symbol is the body, e.g. the `else` clause of a loop is not.
+ASYNC_DEF = "async def"  # marks the scope of a funcdef within an `async def`
+SCOPE_BODIES = {
+    "funcdef": ("suite", lambda outer: scopes.function_body(outer, ASYNC_DEF in outer)),
+    "classdef": ("suite", scopes.class_body),
+    "for_stmt": ("suite", scopes.loop_body),
+    "while_stmt": ("suite", scopes.loop_body),
+    "lambdef": ("test", scopes.lambda_body),
+    "lambdef_nocond": ("test_nocond", scopes.lambda_body),
+    "async_funcdef": ("funcdef", lambda outer: outer | {ASYNC_DEF}),
+    "async_stmt": ("funcdef", lambda outer: outer | {ASYNC_DEF}),
+}
+# The `name` children of these rules are parameters, so must not be duplicated
+# within the enclosing parameter list.
+PARAMETER_LISTS = {"parameters", "lambda_params"}
+PARAMETER_RULES = {
+    "typedparam",
+    "lambda_paramvalue",
+    "lambda_starparams",
+    "lambda_kwparams",
 }
-ALLOWED_CHARS = st.characters(codec="utf-8", min_codepoint=1)
 
 
 class PythonIndenter(Indenter):
@@ -42,86 +102,448 @@ class PythonIndenter(Indenter):
     tab_len = 4
 
 
+def check_compiles(
+    source: Union[str, ast.AST], mode: str, flags: int = 0, *, rule: str = ""
+) -> Any:
+    """Return the result of compiling source, or reject the current example.
+
+    If we're collecting statistics, the time taken and any rejection are recorded
+    for the grammar rule which generated the source.
+    """
+    collector = stats.current()
+    start = perf_counter()
+    try:
+        return compile(source, "<string>", mode, flags)
+    except SyntaxError:
+        # Python's grammar doesn't actually fully describe the behaviour of the
+        # CPython parser and AST-post-processor - even after pruning.py removes
+        # what it can - so we just filter out errors.
+        if collector is not None:
+            collector.record_rejection("grammar", rule, "SyntaxError")
+        assume(False)
+    except Exception as err:  # pragma: no cover
+        # Attempting to compile almost-valid strings has triggered a wide range
+        # of bizzare errors in CPython, especially with the new PEG parser,
+        # and so we maintain this extra clause to ensure that we get a decent
+        # error message out of it.
+        if isinstance(err, SystemError) and (
+            sys.version_info[:3] == (3, 9, 0)
+            or sys.version_info[:3] >= (3, 9, 8)
+            and str(err) == "Negative size passed to PyUnicode_New"
+        ):
+            # We've triggered https://bugs.python.org/issue42218 - it's been
+            # fixed upstream, so we'll treat it as if it were a SyntaxError.
+            # Or the new https://bugs.python.org/issue45738 which makes me
+            # wish CPython would start running proptests in CI already.
+            if collector is not None:
+                collector.record_rejection("grammar", rule, "SystemError")
+            assume(False)
+        raise type(err)(
+            f"compile({ascii(source)}, '<string>', {mode!r}) "
+            f"raised {type(err).__name__}: {str(err)}"
+        ) from err
+    finally:
+        if collector is not None:
+            collector.record_compile("grammar", rule, perf_counter() - start)
+
+
+def check_parses(source: str, mode: str, *, rule: str = "") -> None:
+    """Reject the current example unless source parses, remembering the result.
+
+    We don't need the tree from a parse-only check, so short fragments which were
+    checked recently skip the compiler entirely - see ``hypothesmith.validity``.
+    """
+    flags = ast.PyCF_ONLY_AST
+    cause = validity.cache.get(source, mode, flags)
+    if cause is None:
+        try:
+            check_compiles(source, mode, flags, rule=rule)
+        except UnsatisfiedAssumption:
+            # check_compiles() treats the rare SystemErrors it rejects as if they
+            # were SyntaxErrors, so we do too.
+            validity.cache.put(source, mode, flags, "SyntaxError")
+            raise
+        validity.cache.put(source, mode, flags, "")
+    elif cause:
+        collector = stats.current()
+        if collector is not None:
+            collector.record_rejection("grammar", rule, cause)
+        assume(False)
+
+
+def is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class DrawState(List[str]):
+    """The strings drawn so far, and how much of each budget they have used.
+
+    Each token is appended as we draw it, and ``join_from()`` replaces the tokens
+    of e.g. a checked statement with their source - so the final program is joined
+    from a few statements rather than every token again.
+
+    ``reserved_statements`` and ``reserved_size`` are the least we'll need to
+    finish drawing the enclosing rules, as well as whatever we're drawing now.
+    ``scope`` is the set of scoped features valid where we're drawing, and
+    ``parameters`` the names in the enclosing parameter list, if any.
+    ``used`` is the set of alternatives we chose, and the swarm features for this
+    example are only decided when first needed - so that e.g. the choice of an
+    empty program comes first and is only tried once.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.used: Set[Alternative] = set()
+        self.ignored_tokens: Optional[bool] = None
+        self.separate_tokens: Optional[bool] = None
+        self.depth = 0
+        self.statements = 0
+        self.size = 0
+        self.reserved_statements = 0
+        self.reserved_size = 0
+        self.scope = scopes.MODULE
+        self.parameters: Optional[Set[str]] = None
+
+    def join_from(self, start: int) -> str:
+        """Return the source drawn since ``start``, which replaces those strings."""
+        if len(self) == start + 1:
+            return self[start]
+        source = "".join(self[start:])
+        self[start:] = [source]
+        return source
+
+
 class GrammarStrategy(LarkStrategy):
-    def __init__(self, grammar: Lark, start: str, auto_target: bool):
+    def __init__(
+        self,
+        grammar: Lark,
+        start: str,
+        auto_target: bool,
+        validate: str,
+        max_depth: Optional[int] = None,
+        max_statements: Optional[int] = None,
+        max_source_bytes: Optional[int] = None,
+        output: str = "source",
+    ):
         explicit_strategies = {
             PythonIndenter.INDENT_type: st.just(" " * PythonIndenter.tab_len),
             PythonIndenter.DEDENT_type: st.just(""),
-            "NAME": st.text().filter(str.isidentifier),
+            "NAME": identifiers(),
+            # Numbers are built from their parts, which is much cheaper than
+            # drawing from the terminal regex - see lexical.number_literals().
+            "DEC_NUMBER": decimal_literals(),
+            "HEX_NUMBER": radix_literals(16),
+            "OCT_NUMBER": radix_literals(8),
+            "BIN_NUMBER": radix_literals(2),
+            "FLOAT_NUMBER": float_literals(),
+            "IMAG_NUMBER": imaginary_literals(),
         }
         super().__init__(grammar, start, explicit_strategies, alphabet=ALLOWED_CHARS)
         self.auto_target = auto_target and start != "single_input"
+        self.start_rule = start
+        self.mode = COMPILE_MODES[start]
+        self.output = output
+        self.statement_modes = STATEMENT_MODES if validate == "statement" else {}
+        self.max_depth = max_depth
+        self.max_statements = max_statements
+        self.max_source_bytes = max_source_bytes
+        self.bounded = (max_depth, max_statements, max_source_bytes) != (None,) * 3
+        # For each expansion of each rule, we know the least depth, number of
+        # statements, and size it could possibly be completed in; when drawing we
+        # only choose expansions which fit within the remaining budget.
+        self.completions: Completions = _get_completions(start, grammar.source_grammar)
+        self.expansions = {
+            name: strategy.elements
+            for name, strategy in self.nonterminal_strategies.items()
+        }
+        self.expansion_costs = {
+            name: [self.completions.cost(expansion) for expansion in options]
+            for name, options in self.expansions.items()
+        }
+        self.deepest = {
+            name: max(depth for depth, _, _ in costs)
+            for name, costs in self.expansion_costs.items()
+        }
+        self._bounded_strategies: Dict[Tuple[str, Tuple[int, ...]], Any] = {}
+        self.expansion_index = {
+            name: {expansion: i for i, expansion in enumerate(options)}
+            for name, options in self.expansions.items()
+        }
+        # For rules with scoped symbols, the features each expansion requires; and
+        # for rules which introduce a scope, how to enter it for each child.
+        self.expansion_features = {
+            name: features
+            for name, options in self.expansions.items()
+            for features in [[_required_features(e) for e in options]]
+            if any(features)
+        }
+        self.child_scopes = {
+            name: [_child_scopes(name, expansion) for expansion in options]
+            for name, options in self.expansions.items()
+            if name in SCOPE_BODIES or name.startswith("comprehension")
+        }
+        self._choices_in_scope: Dict[Tuple[str, scopes.Scope], Any] = {}
+        # Strategies are cached, so coverage accumulates over every test which
+        # uses this strategy - and any others from_grammar() with the same arguments.
+        self.coverage = GrammarCoverage(self.expansions)
+        # Targeting on that would make each score depend on every earlier draw in
+        # the process, so the same seed could generate different programs.  We
+        # score rarity against what the current test run has covered instead.
+        self._run_coverage: "WeakKeyDictionary[Random, GrammarCoverage]" = (
+            WeakKeyDictionary()
+        )
+
+    def fits(
+        self, cost: Tuple[float, float, float], state: DrawState, depth_left: int
+    ) -> bool:
+        depth, statements, size = cost
+        return (
+            depth <= depth_left
+            and (
+                self.max_statements is None
+                or state.statements + state.reserved_statements + statements
+                <= self.max_statements
+            )
+            and (
+                self.max_source_bytes is None
+                or state.size + state.reserved_size + size <= self.max_source_bytes
+            )
+        )
+
+    def choices_in_scope(
+        self, name: str, scope: scopes.Scope
+    ) -> Optional[Tuple[int, ...]]:
+        """Return the indices of expansions of `name` valid in scope, or None if all.
+
+        If none are valid, we allow all of them - any scoped symbol is also in
+        another rule, which would have chosen an alternative if it could.
+        """
+        if name not in self.expansion_features:
+            return None
+        try:
+            return self._choices_in_scope[name, scope]
+        except KeyError:
+            features = self.expansion_features[name]
+            choices: Optional[Tuple[int, ...]] = tuple(
+                i for i, required in enumerate(features) if required <= scope
+            )
+            if len(choices) in (0, len(features)):  # type: ignore
+                choices = None
+            return self._choices_in_scope.setdefault((name, scope), choices)
+
+    def expansions_within_budget(
+        self,
+        name: str,
+        state: DrawState,
+        data: Any,
+        in_scope: Optional[Tuple[int, ...]] = None,
+    ) -> Any:
+        """Return a strategy for the expansions of `name` which fit our budget.
+
+        If none do, we choose from the cheapest - so we always steer towards
+        finishing the program, rather than rejecting it after the fact.  If
+        ``in_scope`` is given, we only choose from those expansions.
+        """
+        # Nesting too deeply would get the whole draw discarded, so our depth
+        # budget is whichever is smaller of that limit and the user's max_depth.
+        depth_left = MAX_DEPTH - TERMINAL_SPANS - data.depth
+        if self.max_depth is not None:
+            depth_left = min(depth_left, self.max_depth - state.depth)
+        if in_scope is None and not self.bounded and self.deepest[name] <= depth_left:
+            return self.nonterminal_strategies[name]
+        costs = self.expansion_costs[name]
+        options = range(len(costs)) if in_scope is None else in_scope
+        choices = tuple(i for i in options if self.fits(costs[i], state, depth_left))
+        if len(choices) == len(costs):
+            return self.nonterminal_strategies[name]
+        if not choices:
+            cheapest = min(costs[i] for i in options)
+            choices = tuple(i for i in options if costs[i] == cheapest)
+        try:
+            return self._bounded_strategies[name, choices]
+        except KeyError:
+            strategy = st.sampled_from([self.expansions[name][i] for i in choices])
+            return self._bounded_strategies.setdefault((name, choices), strategy)
+
+    def shortest_in_scope(self, name: str, in_scope: Optional[Tuple[int, ...]]) -> Any:
+        if in_scope is None:
+            return self.completions.shortest[name]
+        costs = self.expansion_costs[name]
+        return self.expansions[name][min(in_scope, key=costs.__getitem__)]
+
+    def run_coverage(self, data: Any) -> GrammarCoverage:
+        """Return the coverage of the test run which data belongs to.
+
+        Hypothesis creates a Random for each test run and passes it to the data for
+        every example, so that identifies the run - though it's a private attribute.
+        Data replaying fixed choices has no Random, and gets empty coverage.
+        """
+        run = data._random
+        if run is None:
+            return GrammarCoverage(self.expansions)
+        try:
+            return self._run_coverage[run]
+        except KeyError:
+            return self._run_coverage.setdefault(run, GrammarCoverage(self.expansions))
 
     def do_draw(self, data):  # type: ignore
-        result = super().do_draw(data)
+        state = DrawState()
+        self.draw_symbol(data, data.draw(self.start), state)
+        result = state.join_from(0)
+        if not self.auto_target and self.output == "source":
+            check_compiles(result, self.mode, rule=self.start_rule)
+            self.coverage.record(state.used)
+            return result
+        tree = check_compiles(
+            result, self.mode, ast.PyCF_ONLY_AST, rule=self.start_rule
+        )
+        code = check_compiles(tree, self.mode, rule=self.start_rule)
         if self.auto_target:
             # target larger inputs - the Hypothesis engine will do a multi-objective
             # hill-climbing search using these scores to generate 'better' examples.
-            nodes = list(ast.walk(ast.parse(result)))
-            uniq_nodes = {type(n) for n in nodes}
-            instructions = list(dis.Bytecode(compile(result, "<string>", "exec")))
+            # We also target examples which use rarely-covered parts of the grammar.
             targets = data.target_observations
-            for value, label in [
-                (instructions, "(hypothesmith) instructions in bytecode"),
-                (nodes, "(hypothesmith) total number of ast nodes"),
-                (uniq_nodes, "(hypothesmith) number of unique ast node types"),
-            ]:
-                targets[label] = max(float(len(value)), targets.get(label, 0.0))
-        return result
+            run = self.run_coverage(data)
+            scores = measure(tree, code).targets("hypothesmith")
+            scores.append(
+                (
+                    run.rarity(state.used),
+                    "(hypothesmith) rarity of grammar alternatives",
+                )
+            )
+            for value, label in scores:
+                targets[label] = max(value, targets.get(label, 0.0))
+            run.record(state.used)
+        self.coverage.record(state.used)
+        return make_output(self.output, result, self.mode, tree, code)
 
     def draw_symbol(self, data, symbol, draw_state):  # type: ignore
         count = len(draw_state)
-        super().draw_symbol(data, symbol, draw_state)
-        if symbol.name in COMPILE_MODES:
-            try:
-                compile(
-                    source="".join(draw_state[count:]),
-                    filename="<string>",
-                    mode=COMPILE_MODES[symbol.name],
+        collector = stats.current()
+        length = data.length
+        try:
+            if isinstance(symbol, Terminal):
+                super().draw_symbol(data, symbol, draw_state)
+                self.separate_tokens(data, draw_state)
+            else:
+                self.draw_nonterminal(data, symbol, draw_state)
+            if isinstance(symbol, Terminal) and self.max_source_bytes is not None:
+                token = draw_state[-1]
+                draw_state.size += (
+                    len(token)
+                    if token.isascii()
+                    else len(token.encode("utf-8", "surrogatepass"))
                 )
-            except SyntaxError:
-                # Python's grammar doesn't actually fully describe the behaviour of the
-                # CPython parser and AST-post-processor, so we just filter out errors.
-                assume(False)
-            except Exception as err:  # pragma: no cover
-                # Attempting to compile almost-valid strings has triggered a wide range
-                # of bizzare errors in CPython, especially with the new PEG parser,
-                # and so we maintain this extra clause to ensure that we get a decent
-                # error message out of it.
-                if isinstance(err, SystemError) and (
-                    sys.version_info[:3] == (3, 9, 0)
-                    or sys.version_info[:3] >= (3, 9, 8)
-                    and str(err) == "Negative size passed to PyUnicode_New"
-                ):
-                    # We've triggered https://bugs.python.org/issue42218 - it's been
-                    # fixed upstream, so we'll treat it as if it were a SyntaxError.
-                    # Or the new https://bugs.python.org/issue45738 which makes me
-                    # wish CPython would start running proptests in CI already.
-                    assume(False)
-                source_code = ascii("".join(draw_state[count:]))
-                raise type(err)(
-                    f"compile({source_code}, '<string>', "
-                    f"{COMPILE_MODES[symbol.name]!r}) "
-                    f"raised {type(err).__name__}: {str(err)}"
-                ) from err
+            if symbol.name in self.statement_modes:
+                # Parse-only, since e.g. `return` is only valid in the enclosing context
+                check_parses(
+                    draw_state.join_from(count),
+                    self.statement_modes[symbol.name],
+                    rule=symbol.name,
+                )
+        finally:
+            if collector is not None:
+                collector.record_draw("grammar", symbol.name, data.length - length)
+
+    def draw_nonterminal(self, data, symbol, draw_state):  # type: ignore
+        # Like LarkStrategy.draw_symbol() for nonterminals, but choosing expansions
+        # which fit in the remaining budget and are valid in the current scope.
+        # While drawing each symbol we reserve the least we'll need for those after
+        # it in the expansion.
+        name = symbol.name
+        data.start_span(self.rule_label(name))
+        draw_state.depth += 1
+        draw_state.statements += name in STATEMENT_RULES
+        in_scope = self.choices_in_scope(name, draw_state.scope)
+        if data.length > CLOSING_FRACTION * data.max_length:
+            expansion = self.shortest_in_scope(name, in_scope)
+        else:
+            strategy = self.expansions_within_budget(name, draw_state, data, in_scope)
+            expansion = data.draw(strategy)
+        index = self.expansion_index[name][expansion]
+        draw_state.used.add((name, index))
+        scope = draw_state.scope
+        enter = self.child_scopes[name][index] if name in self.child_scopes else None
+        parameters = draw_state.parameters
+        if name in PARAMETER_LISTS:
+            draw_state.parameters = set()
+        for i, e in enumerate(expansion):
+            if self.bounded:
+                rest = i + 1
+                statements, size = self.completions.cost(expansion[rest:])[1:]
+                draw_state.reserved_statements += statements
+                draw_state.reserved_size += size
+            if enter is not None and enter[i] is not None:
+                draw_state.scope = enter[i](scope)
+            start = len(draw_state)
+            self.draw_symbol(data, e, draw_state)
+            draw_state.scope = scope
+            if name in PARAMETER_RULES and e.name == "name":
+                self.rename_parameter(draw_state, start)
+            self.gen_ignore(data, draw_state)
+            if self.bounded:
+                draw_state.reserved_statements -= statements
+                draw_state.reserved_size -= size
+        draw_state.parameters = parameters
+        draw_state.depth -= 1
+        data.stop_span()
+
+    def rename_parameter(self, state: DrawState, index: int) -> None:
+        # Duplicate parameter names are a SyntaxError, so we append underscores to
+        # the name token until it's unique in this parameter list.
+        if state.parameters is None:
+            return
+        token = state[index]
+        name = token.lstrip(" ")
+        state[index] = token[: len(token) - len(name)] + scopes.fresh_name(
+            name, state.parameters
+        )
+
+    def separate_tokens(self, data: Any, state: DrawState) -> None:
+        # Tokens are concatenated, so e.g. `match` and `x` would run together into
+        # the name `matchx` unless we happened to generate whitespace between them.
+        # For half of our examples we separate such tokens with a space, so that
+        # statements starting with a keyword can actually be generated.
+        token = state[-1]
+        if not token or not is_word_char(token[0]):
+            return
+        i = len(state) - 2
+        while i >= 0 and not state[i]:
+            i -= 1
+        if i < 0 or not is_word_char(state[i][-1]):
+            return
+        if state.separate_tokens is None:
+            state.separate_tokens = data.draw_boolean(1 / 2)
+        if state.separate_tokens:
+            state[-1] = " " + token
 
     def gen_ignore(self, data, draw_state):  # type: ignore
         # Set a consistent 1/4 chance of generating any ignored tokens (comments,
-        # whitespace, line-continuations) as part of this draw.
-        # See https://github.com/HypothesisWorks/hypothesis/issues/2643 for plans
-        # to do more sophisticated swarm testing for grammars, upstream.
-        if data.draw(
-            st.shared(
-                st.sampled_from([False, True, False, False]),
-                key="hypothesmith_gen_ignored",
-            )
+        # whitespace, line-continuations) as part of this draw.  Together with
+        # separate_tokens() this is a simple form of swarm testing: varying features
+        # between examples generates more diverse programs than fixed probabilities.
+        if data.length > CLOSING_FRACTION * data.max_length or (
+            self.max_source_bytes is not None
+            and draw_state.size + draw_state.reserved_size >= self.max_source_bytes
         ):
+            return
+        if draw_state.ignored_tokens is None:
+            draw_state.ignored_tokens = data.draw_boolean(1 / 4)
+        if draw_state.ignored_tokens:
             super().gen_ignore(data, draw_state)
 
 
 def from_grammar(
-    start: str = "file_input", *, auto_target: bool = True
-) -> st.SearchStrategy[str]:
+    start: str = "file_input",
+    *,
+    auto_target: bool = True,
+    validate: str = "statement",
+    max_depth: Optional[int] = None,
+    max_statements: Optional[int] = None,
+    max_source_bytes: Optional[int] = None,
+    output: str = "source",
+    target_version: Optional[Version] = None,
+) -> st.SearchStrategy[Any]:
     """Generate syntactically-valid Python source code based on the grammar.
 
     Valid values for ``start`` are ``"single_input"``, ``"file_input"``, or
@@ -129,9 +551,42 @@ def from_grammar(
     sequence of commands read from a file, and input for the eval() function.
 
     If ``auto_target`` is True, this strategy uses ``hypothesis.target()``
-    internally to drive towards larger and more complex examples.  We recommend
-    leaving this enabled, as the grammar is quite complex and only simple examples
-    tend to be generated otherwise.
+    internally to drive towards larger and more complex examples, and towards
+    parts of the grammar which earlier examples in the same test run haven't
+    covered.  We recommend leaving this enabled, as the grammar is quite complex
+    and only simple examples tend to be generated otherwise.  The strategy's
+    ``coverage`` attribute counts how many examples used each alternative of each
+    rule in this process, and e.g.
+    ``from_grammar().coverage.uncovered()`` lists those we haven't generated yet.
+
+    ``validate`` controls when we check that generated code is valid.  With the
+    default ``"statement"``, each simple statement is parsed as soon as it is drawn,
+    so that invalid code is rejected early, and the whole program is compiled once
+    at the end.  With ``"top"``, only the final compile is done - less work per
+    example, but invalid code is only rejected after drawing the whole program.
+
+    ``max_depth``, ``max_statements``, and ``max_source_bytes`` limit the depth
+    of the derivation tree, the number of statements, and the size of the program.
+    Once a budget is nearly used up we only choose productions which can be
+    finished within it, so examples stay small without being rejected.  These
+    limits are soft: e.g. a long string literal can exceed ``max_source_bytes``,
+    and if a limit is smaller than any complete program, we generate the smallest.
+    Depth does not limit the width of expressions, so for predictable draw times
+    we recommend ``max_source_bytes`` or ``max_statements``.
+
+    By default we generate strings of source code.  With ``output="ast"`` we
+    generate the ``ast`` tree of each program instead, and with
+    ``output="generated"`` a ``GeneratedSource`` object with the ``source``, its
+    ``tree`` and ``code`` object, and a LibCST ``cst``.  We parse and compile every
+    program anyway, so this saves parsing it again in your test.
+
+    ``target_version`` is a ``(major, minor)`` tuple such as ``(3, 9)``, defaulting
+    to the running version of Python.  We generate from a variant of the grammar
+    without syntax added after that version, such as ``match`` statements before
+    Python 3.10, and constrained to avoid some code which CPython always rejects,
+    such as ``del f()`` or unparenthesized assignment expressions.  This means
+    that far fewer examples are rejected.  Code is still checked by compiling it
+    with the running version, so the target can't be newer than that.
 
     .. warning::
         DO NOT EXECUTE CODE GENERATED BY THIS STRATEGY.
@@ -142,5 +597,99 @@ def from_grammar(
     """
     assert start in {"single_input", "file_input", "eval_input"}
     assert isinstance(auto_target, bool)
-    grammar = Lark(LARK_GRAMMAR, parser="lalr", postlex=PythonIndenter(), start=start)
-    return GrammarStrategy(grammar, start, auto_target)
+    assert validate in VALIDATION_POLICIES
+    for limit in (max_depth, max_statements, max_source_bytes):
+        assert limit is None or (isinstance(limit, int) and limit >= 0), limit
+    assert output in OUTPUTS, output
+    target_version = _check_target_version(target_version)
+    return _get_strategy(
+        start,
+        auto_target,
+        validate,
+        max_depth,
+        max_statements,
+        max_source_bytes,
+        output,
+        target_version,
+    )
+
+
+def _check_target_version(target_version: Optional[Version]) -> Version:
+    if target_version is None:
+        return sys.version_info[:2]
+    assert (
+        isinstance(target_version, tuple) and len(target_version) == 2
+    ), target_version
+    assert all(isinstance(n, int) for n in target_version), target_version
+    assert OLDEST_VERSION <= target_version <= sys.version_info[:2], target_version
+    return target_version
+
+
+def _required_features(expansion: Tuple[Any, ...]) -> FrozenSet[str]:
+    names = [symbol.name for symbol in expansion]
+    if names[:2] == ["ASYNC", "funcdef"]:
+        names = names[1:]
+    features = {SCOPED_SYMBOLS[name] for name in names if name in SCOPED_SYMBOLS}
+    if names[:2] == ["YIELD", "FROM"]:
+        features.add(scopes.YIELD_FROM)
+    return frozenset(features)
+
+
+def _child_scopes(name: str, expansion: Tuple[Any, ...]) -> List[Any]:
+    # For each child of this expansion, the function to enter its scope, if any.
+    if name.startswith("comprehension"):
+        return [scopes.comprehension] * len(expansion)
+    body, enter = SCOPE_BODIES[name]
+    names = [symbol.name for symbol in expansion]
+    enters: List[Any] = [None] * len(names)
+    if body in names:
+        enters[names.index(body)] = enter
+    return enters
+
+
+@lru_cache(maxsize=None)
+def _get_grammar(start: str, grammar: str = LARK_GRAMMAR) -> Lark:
+    # Generating from the grammar only needs the rules and terminals, not the LALR
+    # parse tables, so we build a lexer-only Lark object - several times faster.
+    # The cache is keyed on the grammar text itself, so variants don't collide.
+    return Lark(
+        grammar, parser=None, lexer="basic", postlex=PythonIndenter(), start=start
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_completions(start: str, grammar: str = LARK_GRAMMAR) -> Completions:
+    # The completion table depends only on the grammar, so we share it between
+    # strategies with different budgets.  Our _INDENT terminal is always four
+    # spaces, and the other declared terminals are empty.
+    return completions(
+        _get_grammar(start, grammar),
+        start,
+        {PythonIndenter.INDENT_type: PythonIndenter.tab_len},
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_strategy(
+    start: str,
+    auto_target: bool,
+    validate: str,
+    max_depth: Optional[int] = None,
+    max_statements: Optional[int] = None,
+    max_source_bytes: Optional[int] = None,
+    output: str = "source",
+    target_version: Optional[Version] = None,
+) -> GrammarStrategy:
+    # Building the symbol and terminal tables in LarkStrategy.__init__ is also
+    # slow, so we share strategy instances (and their internal caches) too.
+    grammar = prune_grammar(LARK_GRAMMAR, target_version or sys.version_info[:2])
+    return GrammarStrategy(
+        _get_grammar(start, grammar),
+        start,
+        auto_target,
+        validate,
+        max_depth,
+        max_statements,
+        max_source_bytes,
+        output,
+    )
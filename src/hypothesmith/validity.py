@@ -0,0 +1,81 @@
+"""A bounded cache of whether short fragments of code compile.
+
+While generating and especially while shrinking, we check the same short
+fragments - ``pass``, ``x = 1``, small expressions - over and over.  We only
+need to know whether each compiles, and if not why, so we remember the result
+for recently-checked fragments and skip calling the compiler again.  Long
+fragments are rarely repeated, so we don't cache them at all.
+
+The cache is shared by ``from_grammar()`` and ``from_node()``, and you can
+resize it or check how well it's working::
+
+    from hypothesmith import validity
+
+    validity.cache.resize(10_000)  # or 0 to disable caching
+    ...
+    print(validity.cache.hits, validity.cache.misses)
+"""
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# The number of results we keep by default, and the longest fragment we'll cache.
+DEFAULT_SIZE = 4096
+MAX_CACHED_LENGTH = 200
+
+Key = Tuple[str, str, int]
+
+
+class ValidityCache:
+    """A least-recently-used cache of ``(source, mode, flags)`` -> error type.
+
+    Each result is the name of the type of exception raised by compiling the
+    source, such as ``"SyntaxError"``, or ``""`` if it compiled successfully.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE) -> None:
+        assert isinstance(maxsize, int) and maxsize >= 0, maxsize
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results: "OrderedDict[Key, str]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, source: str, mode: str, flags: int = 0) -> Optional[str]:
+        """Return the cached result for this source, or None if we don't know it."""
+        if len(source) > MAX_CACHED_LENGTH or not self.maxsize:
+            return None
+        key = (source, mode, flags)
+        try:
+            result = self._results[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, source: str, mode: str, flags: int, error: str) -> None:
+        """Record the result of compiling source; ``error`` is ``""`` if valid."""
+        if len(source) > MAX_CACHED_LENGTH or not self.maxsize:
+            return
+        self._results[source, mode, flags] = error
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def resize(self, maxsize: int) -> None:
+        """Keep at most ``maxsize`` results, discarding the least recently used."""
+        assert isinstance(maxsize, int) and maxsize >= 0, maxsize
+        self.maxsize = maxsize
+        while len(self._results) > maxsize:
+            self._results.popitem(last=False)
+
+    def clear(self) -> None:
+        """Discard all cached results, and reset the hit and miss counters."""
+        self._results.clear()
+        self.hits = self.misses = 0
+
+
+cache = ValidityCache()
@@ -0,0 +1,39 @@
+"""Tests for the tables of minimal completions for grammar rules."""
+
+import pytest
+from hypothesis import given, strategies as st
+
+from hypothesmith.completions import STATEMENT_RULES
+from hypothesmith.syntactic import _get_completions
+
+
+def test_empty_module_is_shortest_completion():
+    table = _get_completions("file_input")
+    assert table.shortest["file_input"] == ()
+    assert table.cost(()) == (0, 0, 0)
+    assert (table.depth["file_input"], table.size["file_input"]) == (1, 0)
+
+
+def test_completions_count_statements_and_size():
+    table = _get_completions("file_input")
+    assert table.statements["stmt"] == 1
+    assert table.statements["test"] == 0
+    # Sizes don't count whitespace between tokens, so this is `def a():x\n`
+    assert table.size["funcdef"] == len("def a():x\n") - 1
+
+
+@pytest.mark.parametrize("start", ["eval_input", "single_input"])
+def test_every_rule_can_be_completed(start):
+    table = _get_completions(start)
+    assert table.shortest
+    for name, expansion in table.shortest.items():
+        assert table.depth[name] == 1 + table.cost(expansion)[0] < float("inf")
+
+
+@given(st.sampled_from(sorted(_get_completions("file_input").shortest)))
+def test_completion_costs_are_lower_bounds(name):
+    # The shortest expansion minimises depth first, so it may not be the smallest.
+    table = _get_completions("file_input")
+    _, statements, size = table.cost(table.shortest[name])
+    assert table.statements[name] <= statements + (name in STATEMENT_RULES)
+    assert table.size[name] <= size
@@ -0,0 +1,97 @@
+"""Tests for recording and replaying a corpus of programs."""
+
+import json
+
+import pytest
+from hypothesis import HealthCheck, given, settings, strategies as st
+
+import hypothesmith
+from hypothesmith.corpus import PYTHON_VERSION, Corpus, source_digest
+
+
+def test_corpus_keeps_only_the_best_programs(tmp_path):
+    corpus = Corpus(tmp_path, keep=2)
+    assert corpus.add("a = 1\n", {"size": 1.0})
+    assert corpus.add("b = 2\n", {"size": 2.0})
+    assert not corpus.add("a = 1\n", {"size": 5.0})  # already recorded
+    assert not corpus.add("c = 3\n", {"size": 0.5})
+    assert not corpus.add("c = 3\n", {})
+    assert corpus.add("d = 4\n", {"other": 0.5})
+    assert corpus.add("e = 5\r\n", {"size": 3.0})
+    assert len(list(tmp_path.glob("*.py"))) == len(list(tmp_path.glob("*.json"))) == 4
+    assert Corpus(tmp_path).entries == corpus.entries
+
+
+def test_corpus_loads_programs_without_metadata(tmp_path):
+    (tmp_path / (source_digest("pass\n") + ".py")).write_text("pass\n")
+    (tmp_path / "notes.txt").write_text("not a program")
+    assert Corpus(tmp_path).programs() == ["pass\n"]
+
+
+def test_corpus_replays_programs_with_any_filename(tmp_path):
+    (tmp_path / "seed.py").write_text("x = 1\n")
+    corpus = Corpus(tmp_path)
+    assert list(corpus.entries) == [source_digest("x = 1\n")]
+    assert not corpus.add("x = 1\n", {"size": 1.0})
+    drawn = []
+
+    @settings(max_examples=20, database=None)
+    @given(hypothesmith.from_corpus(tmp_path, st.just("y = 2\n")))
+    def test(source):
+        drawn.append(source)
+
+    test()
+    assert "x = 1\n" in drawn
+
+
+def test_corpus_skips_programs_from_other_python_versions(tmp_path):
+    corpus = Corpus(tmp_path)
+    corpus.add("x = 1\n", {"size": 1.0})
+    corpus.add("yy = 2\n", {"size": 2.0})
+    meta = tmp_path / (source_digest("yy = 2\n") + ".json")
+    assert json.loads(meta.read_text())["python"] == PYTHON_VERSION
+    meta.write_text(json.dumps({"python": "2.7", "targets": {}}))
+    assert Corpus(tmp_path).programs() == ["x = 1\n"]
+
+
+def run_with_corpus(path):
+    drawn = []
+
+    @settings(max_examples=20, deadline=None, database=None)
+    @given(hypothesmith.from_corpus(path, keep=3))
+    def test(source):
+        drawn.append(source)
+        compile(source, "<string>", "exec")
+
+    test()
+    return drawn
+
+
+def test_from_corpus_records_and_replays(tmp_path):
+    drawn = run_with_corpus(tmp_path / "corpus")
+    stored = Corpus(tmp_path / "corpus").programs()
+    assert stored
+    assert len(stored) <= len(set(drawn))
+    assert set(stored) & set(run_with_corpus(tmp_path / "corpus"))
+
+
+def test_from_corpus_replays_target_scores(tmp_path):
+    corpus = Corpus(tmp_path)
+    corpus.add("pass\n", {"(hypothesmith) score": 1e9})
+    scores = []
+
+    @settings(max_examples=5, database=None, suppress_health_check=list(HealthCheck))
+    @given(st.data())
+    def test(data):
+        data.draw(hypothesmith.from_corpus(tmp_path, st.just("pass\n")))
+        observations = data.conjecture_data.target_observations
+        scores.append(observations.get("(hypothesmith) score"))
+
+    test()
+    assert 1e9 in scores
+
+
+@pytest.mark.parametrize("keep", [0, 1.5])
+def test_from_corpus_validates_keep(tmp_path, keep):
+    with pytest.raises(AssertionError):
+        hypothesmith.from_corpus(tmp_path, keep=keep)
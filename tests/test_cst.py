@@ -12,7 +12,12 @@ import pytest
 from hypothesis import example, given, note, strategies as st
 
 import hypothesmith
-from hypothesmith.cst import compilable
+from hypothesmith.cst import (
+    _fields_strategy,
+    builds_filtering,
+    compilable,
+    compile_mode,
+)
 
 NODE_TYPES = frozenset(
     v
@@ -90,3 +95,36 @@ def test_compilable_never_raises(s):
 def test_parso_from_node(source_code):
     result = parso.parse(source_code).get_code()
     assert source_code == result
+
+
+def test_from_node_reuses_cached_strategy():
+    assert hypothesmith.from_node() is hypothesmith.from_node(libcst.Module)
+    assert hypothesmith.from_node() is not hypothesmith.from_node(auto_target=False)
+
+
+@given(st.data())
+def test_builds_filtering_reuses_strategy_for_fields(data):
+    no_parens = st.just(())
+    strategy = builds_filtering(
+        libcst.Name, value=st.just("x"), lpar=no_parens, rpar=no_parens
+    )
+    assert data.draw(strategy).deep_equals(libcst.Name("x"))
+    misses = _fields_strategy.cache_info().misses
+    assert data.draw(strategy).deep_equals(libcst.Name("x"))
+    assert _fields_strategy.cache_info().misses == misses
+
+
+@pytest.mark.parametrize(
+    "node,mode",
+    [
+        (libcst.Name, "eval"),
+        (libcst.BinaryOperation, "eval"),
+        (libcst.Pass, "exec"),
+        (libcst.FunctionDef, "exec"),
+        (libcst.Module, "exec"),
+    ],
+)
+@given(data=st.data())
+def test_from_node_compiles_in_mode_for_node_type(node, mode, data):
+    assert compile_mode(node) == mode
+    compile(data.draw(hypothesmith.from_node(node)), "<string>", mode)
@@ -0,0 +1,90 @@
+"""Tests for generating syntax trees and GeneratedSource objects."""
+
+import ast
+
+import libcst
+import pytest
+from hypothesis import given, strategies as st
+
+import hypothesmith
+from hypothesmith.generated import GeneratedSource, make_output
+
+
+def test_generated_source_computes_results_lazily():
+    generated = GeneratedSource("x = 1\n")
+    assert str(generated) == generated.source == "x = 1\n"
+    assert repr(generated) == "GeneratedSource('x = 1\\n', mode='exec')"
+    assert generated._tree is generated._code is generated._cst is None
+    assert ast.dump(generated.tree) == ast.dump(ast.parse("x = 1\n"))
+    assert generated.code is generated.code
+    assert isinstance(generated.cst, libcst.Module)
+    assert isinstance(GeneratedSource("x + 1", "eval").cst, libcst.BinaryOperation)
+
+
+def test_generated_source_equality():
+    assert GeneratedSource("x") == GeneratedSource("x", cst=libcst.Name("x"))
+    assert GeneratedSource("x") != GeneratedSource("x", "eval")
+    assert GeneratedSource("x") != "x"
+    assert len({GeneratedSource("x"), GeneratedSource("x"), GeneratedSource("y")}) == 2
+
+
+def test_make_output_reuses_tree_and_code():
+    tree = ast.parse("pass")
+    code = compile(tree, "<string>", "exec")
+    assert make_output("source", "pass", "exec", tree, code) == "pass"
+    assert make_output("ast", "pass", "exec", tree, code) is tree
+    generated = make_output("generated", "pass", "exec", tree, code)
+    assert generated.tree is tree
+    assert generated.code is code
+
+
+def check_output(output, value, tree_type):
+    if output == "ast":
+        assert isinstance(value, tree_type)
+    else:
+        assert isinstance(value.tree, tree_type)
+        assert ast.dump(value.tree) == ast.dump(
+            ast.parse(value.source, mode=value.mode)
+        )
+
+
+@pytest.mark.parametrize("output", ["ast", "generated"])
+@pytest.mark.parametrize("auto_target", [True, False])
+@pytest.mark.parametrize(
+    "start,kwargs,tree_type",
+    [
+        ("file_input", {}, ast.Module),
+        ("eval_input", {"max_source_bytes": 40}, ast.Expression),
+    ],
+)
+@given(data=st.data())
+def test_from_grammar_output(output, auto_target, start, kwargs, tree_type, data):
+    strategy = hypothesmith.from_grammar(
+        start, auto_target=auto_target, output=output, **kwargs
+    )
+    check_output(output, data.draw(strategy), tree_type)
+
+
+@pytest.mark.parametrize("output", ["ast", "generated"])
+@pytest.mark.parametrize("auto_target", [True, False])
+@pytest.mark.parametrize(
+    "node,tree_type",
+    [(libcst.Module, ast.Module), (libcst.BinaryOperation, ast.Expression)],
+)
+@given(data=st.data())
+def test_from_node_output(output, auto_target, node, tree_type, data):
+    value = data.draw(
+        hypothesmith.from_node(node, auto_target=auto_target, output=output)
+    )
+    check_output(output, value, tree_type)
+    if output == "generated":
+        assert isinstance(value.cst, node)
+        assert value.source == libcst.Module([]).code_for_node(value.cst)
+
+
+@pytest.mark.parametrize(
+    "strategy", [hypothesmith.from_grammar, hypothesmith.from_node]
+)
+def test_invalid_output(strategy):
+    with pytest.raises(AssertionError):
+        strategy(output="bytecode")
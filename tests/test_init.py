@@ -0,0 +1,46 @@
+"""Tests for the hypothesmith package, which imports its strategies lazily."""
+
+import subprocess  # noqa: S404
+import sys
+from importlib import import_module
+
+import libcst
+import pytest
+
+import hypothesmith
+from hypothesmith.cst import _register_on_first_use
+
+
+@pytest.mark.parametrize("name", hypothesmith.__all__)
+def test_public_strategies_are_imported_on_first_use(name):
+    module = import_module(hypothesmith._LAZY_ATTRIBUTES[name])
+    assert getattr(hypothesmith, name) is getattr(module, name)
+    assert name in vars(hypothesmith)
+
+
+def test_unknown_attributes_raise_attribute_error():
+    name = "from_bytecode"
+    with pytest.raises(AttributeError, match=name):
+        getattr(hypothesmith, name)
+
+
+def test_from_grammar_does_not_import_libcst():
+    code = (
+        "import sys, hypothesmith; "
+        "hypothesmith.from_grammar(); "
+        "assert 'libcst' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)  # noqa: S603
+
+
+def test_from_type_registers_strategies_on_first_use():
+    code = (
+        "import hypothesmith.cst, libcst, hypothesis.strategies as st; "
+        "assert not hypothesmith.cst._registration_started; "
+        "st.from_type(libcst.Name).example(); "
+        "assert hypothesmith.cst._registration_started"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)  # noqa: S603
+    # In this process the strategies are already registered, so we just check
+    # that the placeholder still resolves correctly.
+    assert not _register_on_first_use(libcst.Name).is_empty
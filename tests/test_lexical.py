@@ -0,0 +1,122 @@
+"""Tests for the strategies for individual tokens."""
+
+import ast
+import io
+import re
+import sys
+import token
+import tokenize
+
+import pytest
+from hypothesis import find, given, strategies as st
+
+import hypothesmith
+from hypothesmith import lexical
+from hypothesmith.lexical import (
+    CONTINUE_CATEGORIES,
+    KEYWORDS,
+    SOFT_KEYWORDS,
+    START_CATEGORIES,
+    _identifiers,
+    float_literals,
+    identifier_exceptions,
+    identifiers,
+    imaginary_literals,
+    integer_literals,
+    number_literals,
+    regex_strategy,
+)
+
+
+@given(identifiers())
+def test_identifiers_are_valid(name):
+    assert name.isidentifier()
+    assert name not in KEYWORDS
+    compile(f"{name} = 1", "<string>", "exec")
+
+
+@given(identifiers(exclude_soft_keywords=True))
+def test_identifiers_can_exclude_soft_keywords(name):
+    assert name not in SOFT_KEYWORDS
+
+
+@pytest.mark.parametrize(
+    "categories, char, valid",
+    [
+        (START_CATEGORIES, "\ufdfa", False),
+        (START_CATEGORIES, "_", True),
+        (START_CATEGORIES, "\u2118", True),
+        (CONTINUE_CATEGORIES, "\ufdfa", False),
+        (CONTINUE_CATEGORIES, "\xb7", True),
+    ],
+)
+def test_identifier_exceptions(categories, char, valid):
+    include, exclude = identifier_exceptions()[categories]
+    assert char in (include if valid else exclude)
+
+
+def test_identifier_exceptions_match_every_codepoint(monkeypatch):
+    # Pretending that our table is for an older version of Unicode than this
+    # Python's makes us check every codepoint, which should find the same chars.
+    expected = identifier_exceptions.__wrapped__()
+    monkeypatch.setattr(lexical, "EXCEPTIONS_UNICODE_VERSION", "0.0")
+    assert identifier_exceptions.__wrapped__() == expected
+
+
+@given(_identifiers(KEYWORDS, word_chars_only=True))
+def test_identifiers_of_word_characters(name):
+    assert name.isidentifier()
+    assert re.fullmatch(r"\w+", name)
+
+
+def test_identifiers_shrink_towards_ascii():
+    assert find(identifiers(), lambda name: len(name) >= 3) == "A00"
+
+
+@pytest.mark.parametrize(
+    "strategy, pattern, kind",
+    [
+        (integer_literals(), tokenize.Intnumber, int),
+        (float_literals(), tokenize.Floatnumber, float),
+        (imaginary_literals(), tokenize.Imagnumber, complex),
+        (number_literals(), tokenize.Number, (int, float, complex)),
+    ],
+)
+@given(data=st.data())
+def test_number_literals_are_valid(strategy, pattern, kind, data):
+    literal = data.draw(strategy)
+    assert re.fullmatch(pattern, literal)
+    assert isinstance(ast.literal_eval(literal), kind)
+
+
+def test_number_literals_shrink_to_zero():
+    assert find(number_literals(), lambda n: True) == "0"
+
+
+def test_regex_strategies_are_shared():
+    assert regex_strategy("[a-z]+") is regex_strategy("[a-z]+")
+    assert regex_strategy("[a-z]+") is not regex_strategy("[a-z]+", st.just("a"))
+
+
+@given(hypothesmith.from_tokens())
+def test_from_tokens_matches_tokenize(pair):
+    tokens, source = pair
+    if sys.version_info < (3, 12):
+        # tokenize only recognises names made of `\w` characters, so we don't
+        # generate e.g. combining marks which are otherwise valid in identifiers.
+        assert all(re.fullmatch(r"\w+", s) for t, s in tokens if t == token.NAME)
+    expected = tokenize.generate_tokens(io.StringIO(source).readline)
+    assert tokens == [(t.type, t.string) for t in expected]
+
+
+def test_from_tokens_shrinks_to_empty_program():
+    assert find(hypothesmith.from_tokens(), lambda pair: True) == (
+        [(token.ENDMARKER, "")],
+        "",
+    )
+
+
+@pytest.mark.parametrize("max_lines", [-1, 1.5])
+def test_from_tokens_validates_max_lines(max_lines):
+    with pytest.raises(AssertionError):
+        hypothesmith.from_tokens(max_lines=max_lines)
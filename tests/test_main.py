@@ -0,0 +1,75 @@
+"""Tests for the `python -m hypothesmith` command-line interface."""
+
+import json
+import subprocess  # noqa: S404
+import sys
+
+import pytest
+
+import hypothesmith.__main__
+from hypothesmith.__main__ import main, open_output
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_generate_jsonl(tmp_path, jobs, capsys):
+    output = tmp_path / "corpus.jsonl"
+    args = ["generate", "--count=5", "--start=file_input", f"--output={output}"]
+    assert main([*args, f"--jobs={jobs}", "--no-auto-target"]) == 0
+    programs = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(programs) == 5
+    assert len({p["sha256"] for p in programs}) == 5
+    for p in programs:
+        compile(p["source"], "<string>", "exec")
+    assert "programs/sec" in capsys.readouterr().err
+
+
+def test_generate_directory_from_node(tmp_path):
+    args = ["generate", "--count=3", "--node=Name", "--jobs=1"]
+    assert main([*args, f"--output={tmp_path}"]) == 0
+    files = list(tmp_path.glob("*.py"))
+    assert len(files) == 3
+    for f in files:
+        compile(f.read_text(), str(f), "exec")
+
+
+def test_generate_same_seed_writes_same_programs(tmp_path, monkeypatch):
+    monkeypatch.setattr(hypothesmith.__main__, "BATCH_SIZE", 10)
+    args = ["generate", "--count=30", "--start=file_input", "--seed=3"]
+    outputs = [tmp_path / f"{jobs}-{i}.jsonl" for jobs in (1, 2) for i in range(2)]
+    for output in outputs:
+        jobs = output.name[0]
+        assert main([*args, f"--jobs={jobs}", f"--output={output}"]) == 0
+    assert len({output.read_bytes() for output in outputs}) == 1
+
+
+def test_written_programs_keep_their_line_endings(tmp_path):
+    with open_output(str(tmp_path)) as write:
+        write("digest", "x = 1\r\ny = 2\r")
+    assert (tmp_path / "digest.py").read_bytes() == b"x = 1\r\ny = 2\r"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_generate_reports_too_few_distinct_programs(tmp_path, jobs, capsys):
+    # There's only one program for `pass`, so we skip duplicates and give up.
+    args = ["generate", "--count=50", "--node=Pass", "--max-batches=2"]
+    assert main([*args, f"--jobs={jobs}", f"--output={tmp_path}"]) == 1
+    assert "Only found 1 distinct programs" in capsys.readouterr().err
+    assert len(list(tmp_path.glob("*.py"))) == 1
+
+
+@pytest.mark.parametrize(
+    "args", [["--count=0"], ["--node=NotANode"], ["--node=__name__"], ["--jobs=0"]]
+)
+def test_generate_rejects_invalid_arguments(tmp_path, args):
+    with pytest.raises(SystemExit):
+        main(["generate", f"--output={tmp_path}", *args])
+
+
+def test_can_run_as_module():
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-m", "hypothesmith", "generate", "--help"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert "--output" in result.stdout
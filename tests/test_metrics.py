@@ -0,0 +1,27 @@
+"""Tests for the hypothesmith.metrics module."""
+
+import ast
+import dis
+
+from hypothesis import given
+
+import hypothesmith
+from hypothesmith.metrics import compile_with_tree, measure
+
+
+@given(source_code=hypothesmith.from_grammar(auto_target=False))
+def test_metrics_match_full_listings(source_code):
+    tree, code = compile_with_tree(source_code, "exec")
+    nodes = list(ast.walk(ast.parse(source_code)))
+    assert measure(tree, code) == (
+        len(list(dis.Bytecode(compile(source_code, "<string>", "exec")))),
+        len(nodes),
+        len({type(n) for n in nodes}),
+    )
+
+
+def test_metrics_targets_are_labelled():
+    tree, code = compile_with_tree("x = [y for y in z]", "exec")
+    labels = [label for _, label in measure(tree, code).targets("prefix")]
+    assert all(label.startswith("(prefix) ") for label in labels)
+    assert len(set(labels)) == 3
@@ -0,0 +1,118 @@
+"""Tests for generating programs by mutating seed programs."""
+
+import ast
+from random import Random
+
+import libcst
+import pytest
+from hypothesis import find, given, settings, strategies as st
+from hypothesis.control import BuildContext
+from hypothesis.internal.conjecture.data import ConjectureData
+
+import hypothesmith
+from hypothesmith.mutation import MUTATIONS, mutants, mutation_sites
+
+SEEDS = [
+    "x = 1\n",
+    "def f(a, b=2):\n    if a:\n        return a + b\n    return [b for _ in a]\n",
+    "class C:\n    async def m(self):\n        await self.n(*args)\n",
+    "not(x)\n",
+]
+
+
+def draw_mutant(sources, choices, max_mutations=1, donors=None, seed=None):
+    # Make the given choices - e.g. the seed, number of mutations, site, and kind of
+    # mutation - then random choices for anything else, such as replacement nodes.
+    # Note that sampling from a single option doesn't make a choice.
+    modules = [libcst.parse_module(source) for source in sources]
+    seeds = [(module, mutation_sites(module)) for module in modules]
+    if donors is None:
+        donors = [site.node for _, sites in seeds for site in sites]
+    data = ConjectureData(random=Random(seed), prefix=choices)  # noqa: S311
+    with BuildContext(data, wrapped_test=None):
+        return data.draw(mutants(seeds, donors, max_mutations))
+
+
+@pytest.mark.parametrize("auto_target", [True, False])
+@given(data=st.data())
+def test_mutants_are_valid(auto_target, data):
+    source = data.draw(hypothesmith.from_mutations(SEEDS, auto_target=auto_target))
+    compile(source, "<string>", "exec")
+
+
+def test_mutants_shrink_to_first_seed():
+    strategy = hypothesmith.from_mutations(SEEDS)
+    assert find(strategy, lambda s: True, settings=settings(database=None)) == SEEDS[0]
+
+
+@pytest.mark.parametrize("source", SEEDS)
+def test_mutation_sites(source):
+    module = libcst.parse_module(source)
+    sites = mutation_sites(module)
+    assert sites
+    for i, site in enumerate(sites):
+        node = module
+        for name, index in site.path:
+            node = getattr(node, name) if index is None else getattr(node, name)[index]
+        assert node is site.node
+        assert isinstance(site.node, site.allowed)
+        # Sites nested inside this one are exactly those with a longer path from it.
+        for j, other in enumerate(sites):
+            nested = other.path[: len(site.path)] == site.path and i != j
+            assert nested == (i < j < site.end)
+
+
+SWAP, DUPLICATE, SPLICE = map(MUTATIONS.index, ["swap", "duplicate", "splice"])
+
+
+@pytest.mark.parametrize(
+    "sources,choices,expected",
+    [
+        # No mutations at all, or nothing to mutate
+        (["a\n"], [0], "a\n"),
+        (["", "a\n"], [0, 1], ""),
+        # Swap two statements, or two expressions
+        (["a\nb\n"], [1, 0, SWAP], "b\na\n"),
+        (["a + b\n"], [1, 3, SWAP], "b + a\n"),
+        # Nothing else fits in place of the module's only statement
+        (["a\n"], [1, 0, SWAP], "a\n"),
+        # Duplicate a statement, but not an expression
+        (["a\n"], [1, 0, DUPLICATE], "a\na\n"),
+        (["a\n"], [1, 2, DUPLICATE], "a\n"),
+        # Splice in a subtree from a seed
+        (["a\n", "b\n"], [0, 1, 2, SPLICE, 1], "b\n"),
+        # `not` needs a space before an unparenthesized operand, so LibCST rejects
+        # this mutation and we skip it.
+        (["not(x)\n", "y\n"], [0, 1, 3, SPLICE, 2], "not(x)\n"),
+        # Later mutations apply to the mutated module
+        (["a\n"], [2, 0, DUPLICATE, 3, SWAP], "a\na\n"),
+    ],
+)
+def test_mutations(sources, choices, expected):
+    assert draw_mutant(sources, choices, max_mutations=2) == expected
+
+
+def test_splice_without_donors():
+    assert draw_mutant(["a\n"], [1, 2, SPLICE], donors=[]) == "a\n"
+
+
+@pytest.mark.parametrize("same_type", [1, 0])
+def test_replace_with_drawn_node(same_type):
+    # Replacing `x` in `f(x)` with any node allowed as a function argument, which
+    # may or may not be a Name.
+    choices = [1, 4, MUTATIONS.index("replace"), same_type]
+    source = draw_mutant(["f(x)\n"], choices, seed=0)
+    assert source.startswith("f(")
+    if same_type:
+        assert isinstance(ast.parse(source).body[0].value.args[0], ast.Name)
+
+
+def test_invalid_seed_raises():
+    with pytest.raises(libcst.ParserSyntaxError):
+        hypothesmith.from_mutations(["1 +\n"])
+
+
+@pytest.mark.parametrize("seeds,kwargs", [([], {}), (SEEDS, {"max_mutations": -1})])
+def test_invalid_arguments(seeds, kwargs):
+    with pytest.raises(AssertionError):
+        hypothesmith.from_mutations(seeds, **kwargs)
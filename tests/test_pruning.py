@@ -0,0 +1,76 @@
+"""Tests for the version-specific variants of the grammar."""
+
+import ast
+import sys
+
+import pytest
+from hypothesis import given
+from lark import Lark
+from lark.exceptions import UnexpectedInput
+
+import hypothesmith
+from hypothesmith.pruning import EDITS, OLDEST_VERSION, prune_grammar
+from hypothesmith.syntactic import LARK_GRAMMAR, PythonIndenter
+
+
+def test_match_statements_only_from_python_3_10():
+    assert "match_stmt\n" not in prune_grammar(LARK_GRAMMAR, (3, 9))
+    assert "| try_stmt | match_stmt\n" in prune_grammar(LARK_GRAMMAR, (3, 10))
+
+
+@pytest.mark.parametrize(
+    "source,valid",
+    [
+        ("for a, *b in x:\n    pass\n", True),
+        ("[a for a, *b in x]\n", True),
+        ("a, *b = x\n", True),
+        ("del a, b\n", True),
+        ("del a, *b\n", False),
+        ("f(x) = 1\n", False),
+    ],
+)
+def test_pruned_grammar_targets(source, valid):
+    parser = Lark(
+        prune_grammar(LARK_GRAMMAR, OLDEST_VERSION),
+        parser="earley",
+        lexer="basic",
+        postlex=PythonIndenter(),
+        start="file_input",
+    )
+    try:
+        parser.parse(source)
+    except UnexpectedInput:
+        assert not valid
+    else:
+        assert valid
+
+
+def test_every_edit_changes_the_grammar():
+    for edit in EDITS:
+        assert edit.old in LARK_GRAMMAR
+        assert edit.new != edit.old
+
+
+def test_missing_text_is_an_error():
+    with pytest.raises(AssertionError):
+        prune_grammar("start: name\n", OLDEST_VERSION)
+
+
+@pytest.mark.parametrize(
+    "target_version",
+    [(2, 7), (3, 7), (3,), (3, 8, 0), "3.8", (3, 8.0), (3, sys.version_info[1] + 1)],
+)
+def test_invalid_target_version(target_version):
+    with pytest.raises(AssertionError):
+        hypothesmith.from_grammar(target_version=target_version)
+
+
+def test_default_target_version_is_running_version():
+    assert hypothesmith.from_grammar() is hypothesmith.from_grammar(
+        target_version=sys.version_info[:2]
+    )
+
+
+@given(source_code=hypothesmith.from_grammar(target_version=OLDEST_VERSION))
+def test_generation_for_oldest_version(source_code):
+    ast.parse(source_code, feature_version=OLDEST_VERSION)
@@ -0,0 +1,89 @@
+"""Tests for reducing failing programs."""
+
+import pytest
+from hypothesis import given, settings
+
+import hypothesmith
+from hypothesmith.reduction import reduce_failure, reduce_source
+
+PROGRAM = """\
+import os
+def f(a, b):
+    if a:
+        for i in range(10):
+            print(i, a + b)
+    return [b for _ in a]
+
+class C:
+    def m(self):
+        if not(self):
+            return self.x ** 2 + 1 / 0
+        elif self:
+            for x in self: yield x
+"""
+
+
+@pytest.mark.parametrize(
+    "is_interesting, expected",
+    [
+        (lambda s: "**" in s, "x ** 2\n"),
+        (lambda s: "class" in s, "class C:\n    pass\n"),
+        (lambda s: "[" in s, "[b for _ in a]\n"),
+        (lambda s: "yield" in s, "def m(x):\n    yield x\n"),
+        (lambda s: "elif" in s, "if x:\n    pass\nelif x:\n    pass\n"),
+    ],
+)
+def test_reduce_source(is_interesting, expected):
+    assert reduce_source(PROGRAM, is_interesting) == expected
+
+
+def test_reduce_source_hoists_expressions_in_eval_mode():
+    assert reduce_source("(a + b) * c[1]", lambda s: "c" in s, mode="eval") == "c"
+
+
+def test_reduce_source_skips_edits_which_are_invalid_nodes():
+    # Replacing `(abc)` with `x` would leave no space after `not`.
+    assert reduce_source("not(abc)\n", lambda s: "not" in s) == "not(abc)\n"
+
+
+def test_reduce_source_returns_unparseable_source_unchanged():
+    assert reduce_source("(", lambda s: True) == "("
+
+
+@settings(max_examples=20, deadline=None)
+@given(hypothesmith.from_node(auto_target=False))
+def test_reduced_programs_compile_and_are_interesting(source):
+    def is_interesting(candidate):
+        compile(candidate, "<string>", "exec")
+        return len(candidate.splitlines()) >= min(2, len(source.splitlines()))
+
+    result = reduce_source(source, is_interesting)
+    assert len(result) <= len(source)
+    assert result == source or is_interesting(result)
+
+
+def check_no_division(source):
+    assert "/" not in source, "division"
+
+
+def check_no_power(source):
+    assert "**" not in source, "power"
+
+
+def test_reduce_failure_keeps_the_same_failure():
+    # Both functions raise AssertionError, but from different lines.
+    smaller = reduce_failure(check_no_division, PROGRAM)
+    assert smaller == "1 / 0\n"
+    with pytest.raises(AssertionError, match="division"):
+        check_no_division(smaller)
+
+    def check_both(source):
+        check_no_power(source)
+        check_no_division(source)
+
+    assert reduce_failure(check_both, PROGRAM) == "x ** 2\n"
+
+
+def test_reduce_failure_requires_a_failing_test():
+    with pytest.raises(ValueError):
+        reduce_failure(check_no_division, "x = 1\n")
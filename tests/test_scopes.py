@@ -0,0 +1,170 @@
+"""Tests for generating code which is only valid in some scopes."""
+
+import ast
+from typing import NamedTuple, Optional
+
+import libcst
+from hypothesis import given, reject, strategies as st
+
+import hypothesmith
+from hypothesmith import scopes
+from hypothesmith.cst import _scopes
+from hypothesmith.syntactic import DrawState, _get_strategy
+
+
+def test_nonlocal_only_within_nested_function():
+    module_function = scopes.function_body(scopes.MODULE)
+    assert scopes.NONLOCAL not in module_function
+    assert scopes.NONLOCAL in scopes.function_body(module_function)
+    assert scopes.NONLOCAL not in scopes.class_body(scopes.MODULE)
+    method = scopes.function_body(scopes.class_body(module_function))
+    assert scopes.NONLOCAL in method
+
+
+def test_scopes_within_functions():
+    coroutine = scopes.function_body(scopes.MODULE, is_async=True)
+    assert {scopes.AWAIT, scopes.RETURN, scopes.YIELD} <= coroutine
+    assert scopes.YIELD_FROM not in coroutine
+    assert scopes.LOOP in scopes.loop_body(coroutine)
+    assert scopes.YIELD not in scopes.comprehension(coroutine)
+    assert scopes.AWAIT not in scopes.lambda_body(coroutine)
+    assert scopes.function_body(scopes.loop_body(scopes.MODULE)) == (
+        scopes.function_body(scopes.MODULE)
+    )
+
+
+def test_fresh_name():
+    taken = {"a", "a_"}
+    assert scopes.fresh_name("a", taken) == "a__"
+    assert scopes.fresh_name("b", taken) == "b"
+    assert taken == {"a", "a_", "a__", "b"}
+
+
+def expansion_names(strategy, rule, choices):
+    return [[s.name for s in strategy.expansions[rule][i]] for i in choices]
+
+
+def test_grammar_chooses_flow_statements_in_scope():
+    strategy = _get_strategy("file_input", False, "statement")
+    in_module = strategy.choices_in_scope("flow_stmt", scopes.MODULE)
+    assert expansion_names(strategy, "flow_stmt", in_module) == [["raise_stmt"]]
+    shortest = strategy.shortest_in_scope("flow_stmt", in_module)
+    assert [s.name for s in shortest] == ["raise_stmt"]
+    in_loop = strategy.choices_in_scope(
+        "flow_stmt", scopes.loop_body(scopes.function_body(scopes.MODULE))
+    )
+    assert in_loop is None
+    assert strategy.shortest_in_scope("flow_stmt", in_loop) == (
+        strategy.completions.shortest["flow_stmt"]
+    )
+    # `async def` is valid anywhere, but `async for` only in an async function.
+    in_module = strategy.choices_in_scope("async_stmt", scopes.MODULE)
+    assert expansion_names(strategy, "async_stmt", in_module) == [["ASYNC", "funcdef"]]
+
+
+def test_grammar_renames_duplicate_parameters():
+    state = DrawState()
+    state.extend(["lambda", " a", ",", "a", ":", "a"])
+    state.parameters = {"a"}
+    strategy = _get_strategy("file_input", False, "statement")
+    strategy.rename_parameter(state, 3)
+    assert "".join(state) == "lambda a,a_:a"
+    state.parameters = None
+    strategy.rename_parameter(state, 5)
+    assert state[5] == "a"
+
+
+FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+LOOPS = (ast.For, ast.AsyncFor, ast.While)
+COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+class Context(NamedTuple):
+    function: Optional[ast.AST] = None  # innermost function, unless in a class
+    enclosed: bool = False  # that function or class is inside another function
+    loop: bool = False
+    comprehension: bool = False
+
+
+MODULE = Context()
+
+
+def misplaced(node, context=MODULE):
+    """Yield each scoped statement or expression which is invalid where it is."""
+    if isinstance(node, (ast.Return, ast.Yield, ast.YieldFrom)):
+        if context.function is None or (
+            not isinstance(node, ast.Return) and context.comprehension
+        ):
+            yield node
+    elif isinstance(node, ast.Await):
+        if not isinstance(context.function, ast.AsyncFunctionDef):
+            yield node
+    elif isinstance(node, (ast.Break, ast.Continue)) and not context.loop:
+        yield node
+    elif isinstance(node, ast.Nonlocal) and not context.enclosed:
+        yield node
+    for field, value in ast.iter_fields(node):
+        for i, child in enumerate(value if isinstance(value, list) else [value]):
+            if not isinstance(child, ast.AST):
+                continue
+            inner = context
+            if isinstance(node, FUNCTIONS) and field == "body":
+                inner = Context(node, context.enclosed or context.function is not None)
+            elif isinstance(node, ast.ClassDef) and field == "body":
+                inner = Context(None, context.enclosed or context.function is not None)
+            elif isinstance(node, LOOPS) and field == "body":
+                inner = context._replace(loop=True)
+            elif isinstance(node, COMPREHENSIONS) and not (
+                field == "generators" and i == 0
+            ):
+                inner = context._replace(comprehension=True)
+            elif isinstance(node, ast.comprehension) and field != "iter":
+                inner = context._replace(comprehension=True)
+            yield from misplaced(child, inner)
+
+
+def test_misplaced_finds_scoped_code_in_the_wrong_scope():
+    source = """
+return
+class A:
+    def f():
+        await x
+        nonlocal y
+        def g():
+            nonlocal y
+            while x:
+                break
+                [(yield) for _ in (yield)]
+        lambda: (yield)
+    break
+"""
+    names = [type(node).__name__ for node in misplaced(ast.parse(source))]
+    assert names == ["Return", "Await", "Nonlocal", "Yield", "Break"]
+
+
+@given(st.data())
+def test_grammar_only_draws_scoped_code_in_scope(data):
+    # We draw without the final compile, which would reject misplaced code - so
+    # this checks that we only choose scoped productions where they're valid.
+    strategy = _get_strategy("file_input", False, "statement")
+    conjecture_data = data.conjecture_data
+    state = DrawState()
+    strategy.draw_symbol(conjecture_data, conjecture_data.draw(strategy.start), state)
+    try:
+        tree = ast.parse("".join(state))
+    except SyntaxError:
+        reject()
+    assert not list(misplaced(tree))
+
+
+@given(st.from_type(libcst.Parameters))
+def test_cst_parameter_names_are_distinct(parameters):
+    names = [param.name.value for param in parameters.params]
+    assert len(names) == len(set(names))
+
+
+@given(hypothesmith.from_node(libcst.FunctionDef, auto_target=False))
+def test_cst_functions_compile(source_code):
+    tree = ast.parse(source_code)
+    assert isinstance(tree.body[0], (ast.FunctionDef, ast.AsyncFunctionDef))
+    assert _scopes == [scopes.MODULE]
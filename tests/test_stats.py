@@ -0,0 +1,81 @@
+"""Tests for the hypothesmith.stats module."""
+
+import json
+
+import libcst
+import pytest
+from hypothesis import HealthCheck, given, settings, strategies as st
+from hypothesis.errors import Unsatisfiable
+
+import hypothesmith
+from hypothesmith import stats
+from hypothesmith.cst import builds_filtering, compilable, record_targets
+
+
+def run(strategy):
+    @settings(
+        max_examples=20,
+        database=None,
+        deadline=None,
+        suppress_health_check=list(HealthCheck),
+    )
+    @given(strategy)
+    def inner(_):
+        pass
+
+    inner()
+
+
+def test_no_statistics_collected_by_default():
+    assert stats.current() is None
+
+
+def test_collect_statistics_from_grammar():
+    with stats.collect_statistics() as collected:
+        run(hypothesmith.from_grammar())
+    assert stats.current() is None
+    grammar = collected.as_dict()["grammar"]
+    assert grammar["file_input"]["draws"] > 0
+    assert grammar["file_input"]["choice_bytes"] > 0
+    assert grammar["file_input"]["compile_seconds"] > 0
+
+
+def test_collect_statistics_from_node():
+    with stats.collect_statistics() as collected:
+        run(hypothesmith.from_node(libcst.BinaryOperation))
+    cst = json.loads(collected.to_json())["cst"]
+    assert cst["BinaryOperation"]["draws"] > 0
+    assert cst["BinaryOperation"]["choice_bytes"] > 0
+    assert cst["BinaryOperation"]["compile_seconds"] > 0
+
+
+def test_rejections_are_recorded_by_cause():
+    with stats.collect_statistics() as collected:
+        assert not compilable("1 +", node="BinaryOperation")
+        assert not record_targets("1 +", node="BinaryOperation")
+    result = collected.as_dict()["cst"]["BinaryOperation"]
+    assert result["draws"] == 0
+    assert result["rejections"] == {"SyntaxError": 2}
+    assert result["compile_seconds"] > 0
+
+
+def test_validation_errors_are_recorded():
+    with stats.collect_statistics() as collected:
+        with pytest.raises(Unsatisfiable):
+            run(builds_filtering(libcst.Name, value=st.just("")))
+    result = collected.as_dict()["cst"]["Name"]
+    assert result["rejections"] == {"CSTValidationError": result["draws"]}
+
+
+def test_collectors_nest():
+    with stats.collect_statistics() as outer:
+        with stats.collect_statistics() as inner:
+            assert stats.current() is inner
+        assert stats.current() is outer
+    assert inner is not outer
+
+
+@given(st.data())
+def test_nothing_recorded_outside_context(data):
+    data.draw(hypothesmith.from_node(libcst.Name, auto_target=False))
+    assert stats.current() is None
@@ -0,0 +1,82 @@
+"""Tests for streaming programs from the grammar without a Hypothesis test."""
+
+import ast
+import warnings
+from itertools import islice
+
+import pytest
+from hypothesis import strategies as st
+
+import hypothesmith
+from hypothesmith.corpus import source_digest
+from hypothesmith.streaming import SourceStream
+from hypothesmith.syntactic import check_compiles
+
+
+def test_stream_generates_unique_valid_programs():
+    stream = hypothesmith.stream(seed=0)
+    assert isinstance(stream, SourceStream)
+    programs = list(islice(stream, 20))
+    assert len(set(programs)) == len(programs) == stream.generated
+    for source in programs:
+        ast.parse(source)
+    assert stream.attempts == 20 + stream.rejected + stream.duplicates
+    assert stream.bytes == sum(
+        len(p.encode("utf-8", "surrogatepass")) for p in programs
+    )
+    assert "20 programs" in stream.throughput()
+
+
+def test_stream_is_reproducible_from_seed():
+    stream = hypothesmith.stream("eval_input", max_source_bytes=20)
+    first = list(islice(stream, 10))
+    again = hypothesmith.stream("eval_input", seed=stream.seed, max_source_bytes=20)
+    assert list(islice(again, 10)) == first
+
+
+def test_stream_can_repeat_programs():
+    stream = hypothesmith.stream(seed=0, unique=False, max_source_bytes=0)
+    assert list(islice(stream, 3)) == ["", "", ""]
+    assert stream.duplicates == 0
+
+
+def test_stream_stops_when_out_of_programs():
+    # The only program of zero bytes is "", so every later attempt is a duplicate.
+    stream = hypothesmith.stream(seed=0, max_source_bytes=0, max_failures=10)
+    assert list(stream) == [""]
+    assert stream.duplicates == 10
+    assert list(stream) == []
+    assert stream.duplicates == 10
+
+
+def compiles(source):
+    check_compiles(source, "eval")
+    return source
+
+
+def test_stream_skips_duplicates_by_digest():
+    sources = st.sampled_from(["1", "2"]).map(compiles)
+    stream = SourceStream(sources, seed=0, unique=True)
+    assert sorted(islice(stream, 2)) == ["1", "2"]
+    assert stream.seen == {source_digest("1"), source_digest("2")}
+
+
+def test_stream_hides_syntax_warnings():
+    stream = SourceStream(st.just("1 is 1").map(compiles), seed=0, unique=False)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert next(stream) == "1 is 1"
+    assert caught == []
+
+
+def test_stream_throughput_before_generating():
+    assert "0 programs" in hypothesmith.stream().throughput()
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"seed": 1.5}, {"unique": None}, {"max_depth": -1}, {"max_failures": 0}],
+)
+def test_stream_rejects_invalid_arguments(kwargs):
+    with pytest.raises(AssertionError):
+        hypothesmith.stream(**kwargs)
@@ -12,6 +12,7 @@ import pytest
 from hypothesis import example, given, reject, strategies as st
 
 import hypothesmith
+from hypothesmith.syntactic import DrawState
 
 
 def fixup(s):
@@ -88,16 +89,67 @@ def test_black_autoformatter_from_grammar(source_code, mode):
             black.format_file_contents(result, fast=False, mode=mode)
 
 
+def test_from_grammar_reuses_cached_strategy():
+    assert hypothesmith.from_grammar() is hypothesmith.from_grammar()
+    assert hypothesmith.from_grammar() is not hypothesmith.from_grammar("eval_input")
+
+
+def test_draw_state_joins_in_place():
+    state = DrawState()
+    state.extend(["x", " =", " 1", "\n"])
+    assert state.join_from(1) == " = 1\n"
+    assert state == ["x", " = 1\n"]
+    assert state.join_from(1) == " = 1\n"
+    assert state.join_from(0) == "x = 1\n"
+    assert DrawState().join_from(0) == ""
+
+
 @given(source_code=hypothesmith.from_grammar("eval_input"))
 def test_eval_input_generation(source_code):
     compile(source_code, filename="<string>", mode="eval")
 
 
+@given(source_code=hypothesmith.from_grammar("single_input"))
+def test_single_input_generation(source_code):
+    compile(source_code, filename="<string>", mode="single")
+
+
+@given(source_code=hypothesmith.from_grammar(validate="top"))
+def test_generation_with_top_level_validation(source_code):
+    compile(source_code, filename="<string>", mode="exec")
+
+
 @given(source_code=hypothesmith.from_grammar(auto_target=False))
 def test_generation_without_targeting(source_code):
     compile(source_code, filename="<string>", mode="exec")
 
 
+@pytest.mark.parametrize("limit", ["max_depth", "max_source_bytes"])
+@given(data=st.data())
+def test_zero_budget_generates_empty_program(limit, data):
+    assert data.draw(hypothesmith.from_grammar(**{limit: 0})) == ""
+
+
+@given(source_code=hypothesmith.from_grammar(max_statements=1))
+def test_generation_with_max_statements(source_code):
+    tree = ast.parse(source_code)
+    assert sum(isinstance(node, ast.stmt) for node in ast.walk(tree)) <= 1
+
+
+@given(
+    source_code=hypothesmith.from_grammar(
+        "eval_input", max_depth=40, max_statements=0, max_source_bytes=40
+    )
+)
+def test_eval_input_generation_with_budgets(source_code):
+    compile(source_code, filename="<string>", mode="eval")
+
+
+@given(source_code=hypothesmith.from_grammar(max_source_bytes=5))
+def test_generation_with_tiny_source_budget(source_code):
+    compile(source_code, filename="<string>", mode="exec")
+
+
 @pytest.mark.xfail(sys.version_info >= (3, 13), reason="parso does not support 3.13")
 @given(source_code=hypothesmith.from_grammar())
 def test_parso_from_grammar(source_code):
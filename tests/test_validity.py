@@ -0,0 +1,123 @@
+"""Tests for the cache of whether fragments of code compile."""
+
+import ast
+from itertools import count
+from random import Random
+
+import pytest
+from hypothesis.control import BuildContext
+from hypothesis.errors import StopTest, UnsatisfiedAssumption
+from hypothesis.internal.conjecture.data import ConjectureData
+
+import hypothesmith
+from hypothesmith import stats, validity
+from hypothesmith.cst import compilable
+from hypothesmith.syntactic import check_parses
+from hypothesmith.validity import MAX_CACHED_LENGTH, ValidityCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = ValidityCache()
+    monkeypatch.setattr(validity, "cache", fresh)
+    return fresh
+
+
+def test_cache_counts_hits_and_misses():
+    cache = ValidityCache()
+    assert cache.get("pass", "exec") is None
+    cache.put("pass", "exec", 0, "")
+    cache.put("1 +", "exec", 0, "SyntaxError")
+    assert cache.get("pass", "exec") == ""
+    assert cache.get("1 +", "exec") == "SyntaxError"
+    assert cache.get("1 +", "eval") is None
+    assert cache.get("1 +", "exec", ast.PyCF_ONLY_AST) is None
+    assert (cache.hits, cache.misses) == (2, 3)
+    cache.clear()
+    assert (len(cache), cache.hits, cache.misses) == (0, 0, 0)
+
+
+def test_cache_discards_least_recently_used():
+    cache = ValidityCache(maxsize=2)
+    cache.put("a", "exec", 0, "")
+    cache.put("b", "exec", 0, "")
+    cache.get("a", "exec")
+    cache.put("c", "exec", 0, "")
+    assert cache.get("b", "exec") is None
+    assert cache.get("a", "exec") == cache.get("c", "exec") == ""
+    cache.resize(1)
+    assert len(cache) == 1
+    assert cache.get("c", "exec") == ""
+
+
+@pytest.mark.parametrize(
+    "maxsize, source", [(0, "pass"), (10, "x" * (MAX_CACHED_LENGTH + 1))]
+)
+def test_cache_ignores_uncacheable_results(maxsize, source):
+    cache = ValidityCache(maxsize=maxsize)
+    cache.put(source, "exec", 0, "")
+    assert cache.get(source, "exec") is None
+    assert (len(cache), cache.hits, cache.misses) == (0, 0, 0)
+
+
+@pytest.mark.parametrize("maxsize", [-1, 1.5])
+def test_cache_validates_maxsize(maxsize):
+    with pytest.raises(AssertionError):
+        ValidityCache(maxsize)
+    with pytest.raises(AssertionError):
+        ValidityCache().resize(maxsize)
+
+
+def test_compilable_uses_cache(cache):
+    with stats.collect_statistics() as collected:
+        for _ in range(3):
+            assert compilable("x = 1", node="Assign")
+            assert not compilable("1 +", node="BinaryOperation")
+    assert (cache.hits, cache.misses) == (4, 2)
+    # Rejections are still recorded for cached results.
+    result = collected.as_dict()["cst"]["BinaryOperation"]
+    assert result["rejections"] == {"SyntaxError": 3}
+
+
+def test_check_parses_uses_cache(cache):
+    data = ConjectureData(random=Random(0))  # noqa: S311
+    with stats.collect_statistics() as collected, BuildContext(data, wrapped_test=None):
+        for _ in range(2):
+            check_parses("x = 1\n", "single", rule="simple_stmt")
+            with pytest.raises(UnsatisfiedAssumption):
+                check_parses("1 +\n", "single", rule="simple_stmt")
+    assert (cache.hits, cache.misses) == (2, 2)
+    result = collected.as_dict()["grammar"]["simple_stmt"]
+    assert result["rejections"] == {"SyntaxError": 2}
+
+
+def draw_with_seed(strategy, seed):
+    data = ConjectureData(random=Random(seed))  # noqa: S311
+    try:
+        with BuildContext(data, wrapped_test=None):
+            return data.draw(strategy)
+    except (StopTest, UnsatisfiedAssumption):
+        return None
+    finally:
+        data.freeze()
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    [
+        hypothesmith.from_grammar(auto_target=False),
+        hypothesmith.from_node(auto_target=False),
+    ],
+)
+def test_strategies_hit_cache(cache, strategy):
+    # Find a program which checked some short fragments, and draw it again with the
+    # same seed - this time every fragment should already be in the cache.
+    for seed in count():
+        lookups = cache.hits + cache.misses
+        source = draw_with_seed(strategy, seed)
+        if source is not None and cache.hits + cache.misses > lookups:
+            break
+    hits, misses = cache.hits, cache.misses
+    assert draw_with_seed(strategy, seed) == source
+    assert cache.hits > hits
+    assert cache.misses == misses